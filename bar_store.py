@@ -0,0 +1,260 @@
+"""Incremental on-disk OHLCV store, partitioned by interval and symbol."""
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from utils import get_logger
+
+# Parquet support is optional; without it the store stays disabled
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = get_logger("bar_store")
+
+class BarStore:
+    """Append-only Parquet bar store.
+
+    Layout: <root>/interval=<interval>/symbol=<symbol>/part-*.parquet plus a
+    small _meta.json. Each append writes a new part file; reads merge the
+    parts, drop overlapping bars (newest write wins) and sort by time.
+    """
+
+    def __init__(self, root: str = "bar_store", compact_threshold: int = 8):
+        self.root = root
+        self.compact_threshold = compact_threshold  # parts before auto-compaction
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return PARQUET_AVAILABLE
+
+    def _lock(self, symbol: str, interval: str) -> threading.Lock:
+        with self._locks_guard:
+            key = (symbol, interval)
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _partition_dir(self, symbol: str, interval: str) -> str:
+        safe_symbol = symbol.replace("/", "_").replace("\\", "_")
+        return os.path.join(self.root, f"interval={interval}", f"symbol={safe_symbol}")
+
+    def _part_files(self, symbol: str, interval: str) -> List[str]:
+        part_dir = self._partition_dir(symbol, interval)
+        if not os.path.isdir(part_dir):
+            return []
+        return sorted(
+            os.path.join(part_dir, f) for f in os.listdir(part_dir)
+            if f.startswith("part-") and f.endswith(".parquet")
+        )
+
+    def _new_part_path(self, symbol: str, interval: str) -> str:
+        # Time-ordered names so later parts win when de-duplicating
+        name = f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
+        return os.path.join(self._partition_dir(symbol, interval), name)
+
+    @staticmethod
+    def _write_parquet(df: pd.DataFrame, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _normalize_index(df: pd.DataFrame) -> pd.DataFrame:
+        """Store bar times as naive exchange-local wall times.
+
+        Ticker.history returns tz-aware bars while yf.download's daily bars
+        are naive; mixing both in one partition would make it unreadable.
+        """
+        tz = getattr(df.index, "tz", None)
+        if tz is None:
+            return df
+        df = df.copy()
+        df.index = df.index.tz_localize(None)
+        return df
+
+    @classmethod
+    def _merge(cls, frames: List[pd.DataFrame]) -> pd.DataFrame:
+        # Parts written before normalization may still carry a tz
+        frames = [cls._normalize_index(f) for f in frames]
+        df = pd.concat(frames) if len(frames) > 1 else frames[0]
+        df = df[~df.index.duplicated(keep="last")]
+        return df.sort_index()
+
+    @staticmethod
+    def _align_bound(bound):
+        """Make a start/end bound comparable with the store's naive wall-time index."""
+        bound = pd.Timestamp(bound)
+        return bound.tz_localize(None) if bound.tzinfo is not None else bound
+
+    def _read_all(self, symbol: str, interval: str) -> Optional[pd.DataFrame]:
+        parts = self._part_files(symbol, interval)
+        if not parts:
+            return None
+        return self._merge([pd.read_parquet(p) for p in parts])
+
+    def read(self, symbol: str, interval: str = "1d", start=None, end=None) -> Optional[pd.DataFrame]:
+        """Read stored bars for symbol/interval, optionally limited to [start, end]."""
+        if not self.enabled:
+            return None
+        try:
+            with self._lock(symbol, interval):
+                df = self._read_all(symbol, interval)
+        except Exception as e:
+            logger.error(f"Error reading bars for {symbol} ({interval}): {e}")
+            return None
+        if df is None or df.empty:
+            return None
+        if start is not None:
+            df = df[df.index >= self._align_bound(start)]
+        if end is not None:
+            df = df[df.index <= self._align_bound(end)]
+        return df
+
+    def last_timestamp(self, symbol: str, interval: str = "1d") -> Optional[pd.Timestamp]:
+        """Timestamp of the newest stored bar, or None if nothing is stored."""
+        df = self.read(symbol, interval)
+        return df.index[-1] if df is not None else None
+
+    def append(self, symbol: str, interval: str, df: pd.DataFrame) -> int:
+        """Append bars as a new part file. Returns the number of rows written."""
+        if not self.enabled or df is None or df.empty:
+            return 0
+        try:
+            with self._lock(symbol, interval):
+                os.makedirs(self._partition_dir(symbol, interval), exist_ok=True)
+                self._write_parquet(self._normalize_index(df), self._new_part_path(symbol, interval))
+                if len(self._part_files(symbol, interval)) > self.compact_threshold:
+                    self._compact_locked(symbol, interval)
+            return len(df)
+        except Exception as e:
+            logger.error(f"Error appending bars for {symbol} ({interval}): {e}")
+            return 0
+
+    def replace(self, symbol: str, interval: str, df: pd.DataFrame) -> int:
+        """Replace all stored bars of a partition with df (e.g. after re-adjustment).
+
+        The backfill record is dropped too; callers mark the new coverage.
+        """
+        if not self.enabled or df is None or df.empty:
+            return 0
+        try:
+            with self._lock(symbol, interval):
+                old_parts = self._part_files(symbol, interval)
+                os.makedirs(self._partition_dir(symbol, interval), exist_ok=True)
+                self._write_parquet(self._normalize_index(df), self._new_part_path(symbol, interval))
+                for p in old_parts:
+                    os.remove(p)
+                if os.path.exists(self._meta_path(symbol, interval)):
+                    os.remove(self._meta_path(symbol, interval))
+            return len(df)
+        except Exception as e:
+            logger.error(f"Error replacing bars for {symbol} ({interval}): {e}")
+            return 0
+
+    def _compact_locked(self, symbol: str, interval: str) -> None:
+        parts = self._part_files(symbol, interval)
+        if len(parts) < 2:
+            return
+        merged = self._merge([pd.read_parquet(p) for p in parts])
+        self._write_parquet(merged, self._new_part_path(symbol, interval))
+        for p in parts:
+            os.remove(p)
+        logger.debug(f"Compacted {len(parts)} parts for {symbol} ({interval})")
+
+    def compact(self, symbol: str, interval: str = "1d") -> None:
+        """Merge all part files of a partition into one de-duplicated file."""
+        if not self.enabled:
+            return
+        with self._lock(symbol, interval):
+            self._compact_locked(symbol, interval)
+
+    def _meta_path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self._partition_dir(symbol, interval), "_meta.json")
+
+    def get_meta(self, symbol: str, interval: str = "1d") -> Dict:
+        try:
+            with open(self._meta_path(symbol, interval), "r") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def covers(self, symbol: str, interval: str, start) -> bool:
+        """True if history from `start` onwards was backfilled for this partition."""
+        backfilled_from = self.get_meta(symbol, interval).get("backfilled_from")
+        if not backfilled_from:
+            return False
+        if start is None:
+            # "max" history: only covered by a previous "max" backfill
+            return backfilled_from == "max"
+        if backfilled_from == "max":
+            return True
+        return pd.Timestamp(backfilled_from) <= pd.Timestamp(start).tz_localize(None)
+
+    def mark_backfilled(self, symbol: str, interval: str, start) -> None:
+        """Record that a full download from `start` (None = max) was stored."""
+        meta = self.get_meta(symbol, interval)
+        value = "max" if start is None else pd.Timestamp(start).tz_localize(None).isoformat()
+        if self.covers(symbol, interval, start):
+            return
+        meta.update({"backfilled_from": value, "updated_at": datetime.now().isoformat()})
+        path = self._meta_path(symbol, interval)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error writing bar store metadata for {symbol}: {e}")
+
+# Global store instance
+bar_store = BarStore()
+
+def has_corporate_actions(df: Optional[pd.DataFrame], after) -> bool:
+    """True if df has a dividend or split on a bar later than `after`.
+
+    Stored bars are auto-adjusted, so such a bar means every earlier stored
+    bar now carries a stale adjustment.
+    """
+    if df is None or df.empty:
+        return False
+    columns = [c for c in ("Dividends", "Stock Splits") if c in df.columns]
+    if not columns:
+        return False
+    newer = BarStore._normalize_index(df)
+    newer = newer[newer.index > BarStore._align_bound(after)]
+    return bool((newer[columns].fillna(0) != 0).any().any())
+
+_PERIOD_OFFSETS = {
+    "1d": pd.DateOffset(days=1), "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1), "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6), "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2), "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+def supports_period(period: str) -> bool:
+    """True for the yfinance periods period_start() can translate."""
+    return period in ("ytd", "max") or period in _PERIOD_OFFSETS
+
+def period_start(period: str, now: Optional[datetime] = None) -> Optional[pd.Timestamp]:
+    """Translate a yfinance period string into a naive start timestamp (None = max)."""
+    now = pd.Timestamp(now or datetime.now()).normalize()
+    if period == "ytd":
+        return pd.Timestamp(year=now.year, month=1, day=1)
+    if period == "max":
+        return None
+    if period not in _PERIOD_OFFSETS:
+        raise ValueError(f"Unsupported period: {period}")
+    return now - _PERIOD_OFFSETS[period]
@@ -0,0 +1,105 @@
+"""Micro-benchmark: per-page headline extraction cost, BeautifulSoup selectors vs lxml specs.
+
+    python bench_headline_extraction.py [--repeat N] [--file page.html --source economictimes]
+
+Without --file, a synthetic news homepage (nav, article lists, scripts) is used.
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from bs4 import BeautifulSoup
+
+from headline_extraction import HEADLINE_SPECS, get_spec
+
+# Selectors the specs replace
+LEGACY_SELECTORS = {
+    "default": "h2, h3, a",
+    "moneycontrol": ".srchResult, .clearfix h2, h3 a",
+    "economictimes": ".title, a, h2, h3",
+    "business_standard": "h2, h3, a",
+}
+
+TREND_SELECTORS = [
+    'h1', 'h2', 'h3',
+    '.title', '.headline', '.news-title',
+    'a[title*="news"]', 'a[title*="market"]',
+    '[class*="headline"]', '[class*="title"]'
+]
+
+WORDS = ("sensex nifty rally banks rbi rate policy earnings profit growth slump crude oil rupee "
+         "infosys tcs reliance hdfc auto pharma monsoon budget investors stocks gain fall").split()
+
+def synthetic_page(articles: int = 400, links: int = 1500, seed: int = 7) -> str:
+    rng = random.Random(seed)
+
+    def sentence(n: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize()
+
+    parts = ["<html><head><title>Markets</title>"]
+    parts += [f"<script>var cfg{i} = {{a: {i}, b: '{sentence(20)}'}};</script>" for i in range(30)]
+    parts.append("</head><body><nav>")
+    parts += [f'<a href="/s/{i}">{sentence(2)}</a>' for i in range(links // 3)]
+    parts.append("</nav><main>")
+    for i in range(articles):
+        parts.append(
+            f'<div class="clearfix story"><h2 class="title"><a href="/a/{i}" title="market news">'
+            f'{sentence(10)}</a></h2><p class="summary">{sentence(40)}</p>'
+            f'<span class="headline-meta">{sentence(3)}</span></div>'
+        )
+    parts.append("</main><footer>")
+    parts += [f'<a href="/f/{i}">{sentence(rng.randint(2, 8))}</a>' for i in range(links)]
+    parts.append("</footer></body></html>")
+    return "".join(parts)
+
+def legacy_source(html: str, source: str) -> List[str]:
+    """data_fetcher's previous path."""
+    soup = BeautifulSoup(html, "lxml")
+    return [t for t in (e.get_text(strip=True) for e in soup.select(LEGACY_SELECTORS[source])) if len(t) > 20]
+
+def legacy_trends(html: str) -> List[str]:
+    """DynamicReasonGenerator's previous path."""
+    soup = BeautifulSoup(html, "html.parser")
+    headlines = []
+    for selector in TREND_SELECTORS:
+        for element in soup.select(selector)[:20]:
+            text = element.get_text(strip=True)
+            if 15 < len(text) < 200:
+                headlines.append(text)
+    return headlines[:50]
+
+def time_per_call(fn: Callable[[str], List[str]], html: str, repeat: int) -> float:
+    fn(html)  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(html)
+    return (time.perf_counter() - started) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--file", help="saved HTML page to benchmark instead of the synthetic one")
+    parser.add_argument("--source", default="economictimes", choices=sorted(LEGACY_SELECTORS))
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8", errors="replace") as f:
+            html = f.read()
+    else:
+        html = synthetic_page()
+    print(f"page: {len(html) / 1024:.0f} KiB, {args.repeat} runs each\n")
+
+    cases = [
+        (f"source '{args.source}'", lambda h: legacy_source(h, args.source), get_spec(args.source).extract),
+        ("trends", legacy_trends, HEADLINE_SPECS["trends"].extract),
+    ]
+    print(f"{'case':<24}{'bs4 ms':>10}{'lxml ms':>10}{'speedup':>10}{'bs4 n':>8}{'lxml n':>8}")
+    for name, legacy, spec in cases:
+        legacy_ms = time_per_call(legacy, html, args.repeat) * 1000
+        spec_ms = time_per_call(spec, html, args.repeat) * 1000
+        print(f"{name:<24}{legacy_ms:>10.1f}{spec_ms:>10.1f}{legacy_ms / spec_ms:>9.1f}x"
+              f"{len(legacy(html)):>8}{len(spec(html)):>8}")
+
+if __name__ == "__main__":
+    main()
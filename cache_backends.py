@@ -0,0 +1,304 @@
+"""Storage backends for the disk cache tier: one file per key, or a SQLite database."""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from cache_serializers import (
+    default_mode, decode_entry, encode_entry, file_extension, loading_serializer,
+    read_file_metadata, select_serializer
+)
+from utils import get_logger
+
+logger = get_logger("cache_backends")
+
+def default_backend() -> str:
+    """'file' unless CACHE_BACKEND=sqlite is set."""
+    backend = os.environ.get("CACHE_BACKEND", "file").lower()
+    return backend if backend in ("file", "sqlite") else "file"
+
+def _entry(data: Any, created_at: float, ttl: Optional[float], namespace: Optional[str]) -> Dict[str, Any]:
+    """Entry dict returned by every backend's get()."""
+    return {
+        'data': data,
+        'timestamp': datetime.fromtimestamp(created_at),
+        'ttl': ttl,
+        'expires_at': created_at + ttl if ttl is not None else None,
+        'namespace': namespace
+    }
+
+class FileCacheBackend:
+    """One encoded file per key in a directory."""
+
+    def __init__(self, cache_dir: str, serializer: Optional[str] = None):
+        self.cache_dir = cache_dir
+        self.serializer = serializer or default_mode()  # "binary", or "json" for debugging
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str, mode: Optional[str] = None) -> str:
+        safe_key = key.replace("/", "_").replace("\\", "_").replace(":", "__")
+        return os.path.join(self.cache_dir, f"{safe_key}{file_extension(mode or self.serializer)}")
+
+    def _find(self, key: str) -> Optional[str]:
+        """Find an existing cache file for key, in either format."""
+        for mode in (self.serializer, "binary", "json"):
+            path = self._path(key, mode)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entry_files(self) -> List[str]:
+        try:
+            return [f for f in os.listdir(self.cache_dir) if not f.endswith(".tmp")]
+        except OSError:
+            return []
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the entry for key (expired ones are removed), or None."""
+        path = self._find(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                cached = decode_entry(f.read())
+            created_at = datetime.fromisoformat(cached.get('timestamp', '1970-01-01')).timestamp()
+            entry = _entry(cached['data'], created_at, cached.get('ttl'), cached.get('namespace'))
+        except Exception as e:
+            logger.error(f"Error reading cache file {key}: {e}")
+            self._remove(path)  # corrupted
+            return None
+        if entry['expires_at'] is not None and entry['expires_at'] <= time.time():
+            self._remove(path)
+            return None
+        return entry
+
+    def set(self, key: str, data: Any, ttl: Optional[float] = None,
+            namespace: Optional[str] = None, timestamp: Optional[datetime] = None) -> None:
+        metadata = {
+            'timestamp': (timestamp or datetime.now()).isoformat(),
+            'ttl': ttl,
+            'key': key,
+            'namespace': namespace
+        }
+        path = self._path(key)
+        try:
+            # Write then rename so readers never see a half-written file
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(encode_entry(data, metadata, self.serializer))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error writing cache file {key}: {e}")
+
+    def delete(self, key: str) -> None:
+        for mode in ("binary", "json"):
+            self._remove(self._path(key, mode))
+
+    def clear(self, pattern: Optional[str] = None, namespace: Optional[str] = None) -> int:
+        """Remove all entries, or those matching a key substring and/or namespace."""
+        removed = 0
+        for filename in self._entry_files():
+            path = os.path.join(self.cache_dir, filename)
+            if pattern is not None and pattern not in filename:
+                continue
+            if namespace is not None:
+                try:
+                    if read_file_metadata(path).get('namespace') != namespace:
+                        continue
+                except Exception:
+                    continue
+            self._remove(path)
+            removed += 1
+        return removed
+
+    def purge_expired(self) -> int:
+        """Remove expired and unreadable entries. Returns the number removed."""
+        removed = 0
+        now = time.time()
+        for filename in self._entry_files():
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                metadata = read_file_metadata(path)
+                ttl = metadata.get('ttl')
+                created_at = datetime.fromisoformat(metadata.get('timestamp', '1970-01-01')).timestamp()
+                if ttl is None or created_at + ttl > now:
+                    continue
+            except Exception:
+                pass  # corrupted file
+            self._remove(path)
+            removed += 1
+        return removed
+
+class SQLiteCacheBackend:
+    """All entries in one SQLite database (WAL mode).
+
+    Keys, namespaces and expiry times are indexed, so lookups, namespace
+    invalidation and expiry sweeps are index queries rather than directory
+    scans. WAL lets several reader processes share the file while one writes.
+
+    With trusted=False (a database others can write to, e.g. on a shared
+    volume) values are stored in data-only formats and pickled entries are
+    never loaded.
+    """
+
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS cache_entries (
+            key TEXT PRIMARY KEY,
+            namespace TEXT,
+            format TEXT NOT NULL,
+            value BLOB NOT NULL,
+            created_at REAL NOT NULL,
+            ttl REAL,
+            expires_at REAL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_cache_namespace ON cache_entries(namespace)",
+        "CREATE INDEX IF NOT EXISTS idx_cache_expires_at ON cache_entries(expires_at)",
+    )
+
+    def __init__(self, path: str, serializer: Optional[str] = None, timeout: float = 30.0,
+                 trusted: bool = True):
+        self.path = path
+        self.serializer = serializer or default_mode()
+        self.trusted = trusted
+        self.timeout = timeout
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; sqlite3 connections aren't shareable across threads."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _encode(self, data: Any):
+        serializer = select_serializer(data, self.serializer, allow_pickle=self.trusted)
+        return serializer.name, sqlite3.Binary(serializer.dumps(data))
+
+    def _row_to_entry(self, row) -> Optional[Dict[str, Any]]:
+        key, namespace, fmt, value, created_at, ttl = row
+        try:
+            data = loading_serializer(fmt, allow_pickle=self.trusted).loads(bytes(value))
+        except Exception as e:
+            logger.error(f"Error decoding cache entry {key}: {e}")
+            self.delete(key)
+            return None
+        return _entry(data, created_at, ttl, namespace)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the live entry for key, or None."""
+        row = self._conn().execute(
+            "SELECT key, namespace, format, value, created_at, ttl FROM cache_entries "
+            "WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Return {key: entry} for the live entries among keys."""
+        keys = list(keys)
+        found = {}
+        now = time.time()
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn().execute(
+                "SELECT key, namespace, format, value, created_at, ttl FROM cache_entries "
+                f"WHERE key IN ({placeholders}) AND (expires_at IS NULL OR expires_at > ?)",
+                (*chunk, now)
+            ).fetchall()
+            for row in rows:
+                entry = self._row_to_entry(row)
+                if entry is not None:
+                    found[row[0]] = entry
+        return found
+
+    def set(self, key: str, data: Any, ttl: Optional[float] = None,
+            namespace: Optional[str] = None, timestamp: Optional[datetime] = None) -> None:
+        self.set_many({key: data}, ttl=ttl, namespace=namespace, timestamp=timestamp)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None,
+                 namespace: Optional[str] = None, timestamp: Optional[datetime] = None) -> None:
+        """Store several entries in one transaction."""
+        created_at = (timestamp or datetime.now()).timestamp()
+        expires_at = created_at + ttl if ttl is not None else None
+        try:
+            rows = [(key, namespace, *self._encode(data), created_at, ttl, expires_at)
+                    for key, data in items.items()]
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO cache_entries "
+                    "(key, namespace, format, value, created_at, ttl, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except Exception as e:
+            logger.error(f"Error writing {len(items)} cache entries: {e}")
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self, pattern: Optional[str] = None, namespace: Optional[str] = None,
+              prefix: Optional[str] = None) -> int:
+        """Remove all entries, or those matching a namespace, key prefix and/or substring.
+
+        Namespace and prefix filters use indexes; a substring pattern only
+        has to scan the key column.
+        """
+        clauses, params = [], []
+        if namespace is not None:
+            clauses.append("namespace = ?")
+            params.append(namespace)
+        if prefix:
+            # Range scan on the primary key instead of LIKE
+            clauses.append("key >= ? AND key < ?")
+            params.extend([prefix, prefix + "\U0010ffff"])
+        if pattern:
+            clauses.append("instr(key, ?) > 0")
+            params.append(pattern)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        cursor = self._conn().execute(f"DELETE FROM cache_entries{where}", params)
+        return cursor.rowcount
+
+    def purge_expired(self) -> int:
+        """Delete expired entries via the expires_at index. Returns the number removed."""
+        cursor = self._conn().execute(
+            "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (time.time(),)
+        )
+        return cursor.rowcount
+
+    def count(self, namespace: Optional[str] = None) -> int:
+        if namespace is None:
+            return self._conn().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (namespace,)
+        ).fetchone()[0]
+
+def create_backend(kind: str, location: str, serializer: Optional[str] = None):
+    """Build a backend: 'file' uses location as a directory, 'sqlite' stores location/cache.db."""
+    if kind == "sqlite":
+        return SQLiteCacheBackend(os.path.join(location, "cache.db"), serializer=serializer)
+    return FileCacheBackend(location, serializer=serializer)
@@ -2,163 +2,45 @@
 import time
 import json
 import os
+import hashlib
+import functools
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
+from single_flight import SingleFlight, process_locks_enabled
+from tiered_cache import TieredCache, make_key, tiered_cache
 from utils import get_logger
 
 logger = get_logger("cache_manager")
 
+# Seconds a fallback result is reused before the real source is tried again
+FALLBACK_TTL = int(os.environ.get("FALLBACK_TTL", 15))
+
 class CacheManager:
-    def __init__(self, cache_dir: str = "cache", default_ttl: int = 30):
-        self.cache_dir = cache_dir
-        self.default_ttl = default_ttl  # seconds
-        self.memory_cache = {}
-        
-        # Create cache directory if it doesn't exist
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
+    """Key/TTL interface for cached_call, backed by the shared tiered cache."""
     
-    def _get_cache_file_path(self, key: str) -> str:
-        """Get file path for cached data."""
-        safe_key = key.replace("/", "_").replace("\\", "_")
-        return os.path.join(self.cache_dir, f"{safe_key}.json")
-    
-    def _is_expired(self, timestamp: datetime, ttl: int) -> bool:
-        """Check if cached data is expired."""
-        return (datetime.now() - timestamp).total_seconds() > ttl
+    def __init__(self, tiered: Optional[TieredCache] = None, default_ttl: int = 30):
+        self.tiered = tiered or tiered_cache
+        self.default_ttl = default_ttl  # seconds, for namespaces without a policy
+        self.cache_dir = self.tiered.cache_dir
+        self.memory_cache = self.tiered.memory
     
     def get(self, key: str, ttl: Optional[int] = None) -> Optional[Any]:
-        """Get data from cache (memory first, then file)."""
-        ttl = ttl or self.default_ttl
-        
-        # Check memory cache first
-        if key in self.memory_cache:
-            data, timestamp = self.memory_cache[key]
-            if not self._is_expired(timestamp, ttl):
-                logger.debug(f"Cache hit (memory): {key}")
-                return data
-            else:
-                # Remove expired memory cache
-                del self.memory_cache[key]
-        
-        # Check file cache
-        cache_file = self._get_cache_file_path(key)
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r') as f:
-                    cached_data = json.load(f)
-                
-                timestamp = datetime.fromisoformat(cached_data.get('timestamp', '1970-01-01'))
-                if not self._is_expired(timestamp, ttl):
-                    logger.debug(f"Cache hit (file): {key}")
-                    # Store in memory for faster access
-                    self.memory_cache[key] = (cached_data['data'], timestamp)
-                    return cached_data['data']
-                else:
-                    # Remove expired file cache
-                    os.remove(cache_file)
-                    logger.debug(f"Removed expired cache file: {key}")
-                    
-            except Exception as e:
-                logger.error(f"Error reading cache file {key}: {e}")
-                # Remove corrupted cache file
-                try:
-                    os.remove(cache_file)
-                except:
-                    pass
-        
-        logger.debug(f"Cache miss: {key}")
-        return None
+        """Get data from cache (memory first, then disk), no older than ttl seconds if given."""
+        return self.tiered.get(key, max_age=ttl)
     
     def set(self, key: str, data: Any, ttl: Optional[int] = None) -> None:
-        """Store data in cache (both memory and file)."""
-        ttl = ttl or self.default_ttl
-        timestamp = datetime.now()
-        
-        # Store in memory
-        self.memory_cache[key] = (data, timestamp)
-        
-        # Store in file
-        cache_file = self._get_cache_file_path(key)
-        try:
-            cached_data = {
-                'data': data,
-                'timestamp': timestamp.isoformat(),
-                'ttl': ttl
-            }
-            
-            with open(cache_file, 'w') as f:
-                json.dump(cached_data, f, indent=2, default=str)
-                
-            logger.debug(f"Cached data: {key}")
-            
-        except Exception as e:
-            logger.error(f"Error writing cache file {key}: {e}")
+        """Store data in every cache tier; ttl defaults to the key's namespace policy."""
+        self.tiered.set(key, data, ttl)
     
-    def clear(self, pattern: Optional[str] = None) -> None:
-        """Clear cache entries."""
-        if pattern:
-            # Clear specific pattern
-            keys_to_remove = [k for k in self.memory_cache.keys() if pattern in k]
-            for key in keys_to_remove:
-                del self.memory_cache[key]
-            
-            # Clear matching files
-            for filename in os.listdir(self.cache_dir):
-                if pattern in filename:
-                    try:
-                        os.remove(os.path.join(self.cache_dir, filename))
-                    except:
-                        pass
-        else:
-            # Clear all
-            self.memory_cache.clear()
-            try:
-                for filename in os.listdir(self.cache_dir):
-                    os.remove(os.path.join(self.cache_dir, filename))
-            except:
-                pass
-        
-        logger.info(f"Cleared cache: {pattern or 'all'}")
+    def clear(self, pattern: Optional[str] = None, namespace: Optional[str] = None) -> None:
+        """Clear cache entries, optionally only those matching a key pattern or namespace."""
+        self.tiered.invalidate(namespace=namespace, pattern=pattern)
     
     def cleanup_expired(self) -> None:
         """Remove all expired cache entries."""
-        current_time = datetime.now()
-        
-        # Clean memory cache
-        expired_keys = []
-        for key, (data, timestamp) in self.memory_cache.items():
-            if self._is_expired(timestamp, self.default_ttl):
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            del self.memory_cache[key]
-        
-        # Clean file cache
-        try:
-            for filename in os.listdir(self.cache_dir):
-                cache_file = os.path.join(self.cache_dir, filename)
-                try:
-                    with open(cache_file, 'r') as f:
-                        cached_data = json.load(f)
-                    
-                    timestamp = datetime.fromisoformat(cached_data.get('timestamp', '1970-01-01'))
-                    ttl = cached_data.get('ttl', self.default_ttl)
-                    
-                    if self._is_expired(timestamp, ttl):
-                        os.remove(cache_file)
-                        
-                except:
-                    # Remove corrupted files
-                    try:
-                        os.remove(cache_file)
-                    except:
-                        pass
-        except:
-            pass
-        
-        if expired_keys:
-            logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
+        expired_count = self.tiered.purge_expired()
+        if expired_count:
+            logger.info(f"Cleaned up {expired_count} expired cache entries")
 
 class FallbackManager:
     """Fallback data provider when real-time data is not available."""
@@ -248,22 +130,80 @@ class FallbackManager:
 cache_manager = CacheManager()
 fallback_manager = FallbackManager()
 
-def cached_call(key: str, func, ttl: Optional[int] = None, use_fallback: bool = True):
-    """Decorator/function to cache expensive function calls."""
+# Coalesces concurrent misses; CACHE_PROCESS_LOCKS=1 extends this across worker processes
+cache_flight = SingleFlight(
+    lock_dir=f"{cache_manager.cache_dir}_locks" if process_locks_enabled() else None
+)
+
+# Bump to invalidate every cached_call entry after a change in cached value shapes
+CACHE_KEY_VERSION = 1
+
+def _canonicalize(value: Any) -> Any:
+    """Convert call arguments into a JSON structure that is stable across processes."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _canonicalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonicalize(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonicalize(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True))
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if type(value).__repr__ is object.__repr__:
+        # Default reprs embed memory addresses; fall back to the type name
+        return f"<{type(value).__module__}.{type(value).__qualname__}>"
+    return repr(value)
+
+def make_cache_key(namespace: str, args: tuple = (), kwargs: Optional[Dict] = None) -> str:
+    """Build a deterministic cache key from a namespace and call arguments."""
+    payload = json.dumps(
+        [_canonicalize(args), _canonicalize(kwargs or {})],
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+    return make_key(namespace, f"v{CACHE_KEY_VERSION}_{digest}")
+
+def is_fallback(value: Any) -> bool:
+    """True for the synthetic data FallbackManager returns."""
+    return isinstance(value, dict) and bool(value.get('fallback'))
+
+def cached_call(key: str, func=None, ttl: Optional[int] = None, use_fallback: bool = True):
+    """Cache expensive function calls.
+
+    Use as cached_call("name", func, ttl=30) to wrap a function once, or as a
+    decorator: @cached_call("name", ttl=30). Without ttl, the name's
+    namespace policy in tiered_cache decides how long results live.
+    wrapper.refresh(*args) recomputes an entry ahead of its expiry.
+    """
+    if func is None:
+        return lambda f: cached_call(key, f, ttl=ttl, use_fallback=use_fallback)
+
+    def compute(cache_key: str, args: tuple, kwargs: Dict):
+        value = func(*args, **kwargs)
+        if is_fallback(value):
+            # Synthetic data must not outlive the outage: memory only, briefly
+            cache_manager.memory_cache.set(cache_key, value, FALLBACK_TTL)
+        elif value is not None:
+            cache_manager.set(cache_key, value, ttl)
+        return value
+    
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        cache_key = f"{key}_{hash(str(args) + str(kwargs))}"
+        cache_key = make_cache_key(key, args, kwargs)
         
         # Try to get from cache
         result = cache_manager.get(cache_key, ttl)
         if result is not None:
             return result
         
-        # Call the function
+        # Call the function; concurrent callers for this key share one call
         try:
-            result = func(*args, **kwargs)
-            if result is not None:
-                cache_manager.set(cache_key, result, ttl)
-            return result
+            return cache_flight.do(
+                cache_key, lambda: compute(cache_key, args, kwargs),
+                recheck=lambda: cache_manager.get(cache_key, ttl)
+            )
         except Exception as e:
             logger.error(f"Error in cached call {key}: {e}")
             
@@ -278,6 +218,12 @@ def cached_call(key: str, func, ttl: Optional[int] = None, use_fallback: bool =
             
             return None
     
+    def refresh(*args, **kwargs):
+        """Recompute and re-cache the result for these arguments, ignoring the cached value."""
+        cache_key = make_cache_key(key, args, kwargs)
+        return cache_flight.do(cache_key, lambda: compute(cache_key, args, kwargs))
+    
+    wrapper.refresh = refresh
     return wrapper
 
 def cleanup_cache():
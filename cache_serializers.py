@@ -0,0 +1,222 @@
+"""Serializers for cache entries: binary by default, JSON for debugging."""
+import base64
+import io
+import json
+import os
+import pickle
+import struct
+from datetime import date, datetime
+from typing import Any, Dict
+
+from utils import get_logger
+
+try:
+    import pandas as pd
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pd = None
+    PARQUET_AVAILABLE = False
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = get_logger("cache_serializers")
+
+# Binary entry layout: MAGIC | uint32 header length | JSON header | payload
+MAGIC = b"SMC1"
+_HEADER_LEN = struct.Struct(">I")
+
+class Serializer:
+    name = "base"
+
+    def can_handle(self, value: Any) -> bool:
+        return True
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, raw: bytes) -> Any:
+        raise NotImplementedError
+
+class PickleSerializer(Serializer):
+    """Fast binary format for dicts, lists, scalars, numpy values and datetimes.
+
+    Loading a pickle can run arbitrary code, so it is only used for stores
+    only this app writes (its local cache dir). Stores that anyone else can
+    write to, such as the shared tier, use DataSerializer.
+    """
+    name = "pickle"
+
+    def dumps(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, raw: bytes) -> Any:
+        return pickle.loads(raw)
+
+class ParquetSerializer(Serializer):
+    """Columnar format for DataFrames (keeps dtypes, index and timezones)."""
+    name = "parquet"
+
+    def can_handle(self, value: Any) -> bool:
+        return PARQUET_AVAILABLE and isinstance(value, pd.DataFrame)
+
+    def dumps(self, value: Any) -> bytes:
+        buf = io.BytesIO()
+        value.to_parquet(buf)
+        return buf.getvalue()
+
+    def loads(self, raw: bytes) -> Any:
+        return pd.read_parquet(io.BytesIO(raw))
+
+def _to_data(value: Any) -> Any:
+    """JSON-compatible form of value; types JSON lacks are tagged {"__t": type, ...}."""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        if all(isinstance(k, str) for k in value) and "__t" not in value:
+            return {k: _to_data(v) for k, v in value.items()}
+        return {"__t": "dict", "items": [[_to_data(k), _to_data(v)] for k, v in value.items()]}
+    if isinstance(value, list):
+        return [_to_data(v) for v in value]
+    if isinstance(value, (tuple, set, frozenset)):
+        return {"__t": type(value).__name__, "items": [_to_data(v) for v in value]}
+    if pd is not None:
+        if isinstance(value, pd.Timestamp):
+            return {"__t": "timestamp", "v": value.isoformat()}
+        if isinstance(value, (pd.DataFrame, pd.Series)) and PARQUET_AVAILABLE:
+            series = isinstance(value, pd.Series)
+            frame = value.to_frame(name="__series__" if value.name is None else value.name) if series else value
+            buf = io.BytesIO()
+            frame.to_parquet(buf)
+            return {"__t": "series" if series else "frame", "v": base64.b64encode(buf.getvalue()).decode("ascii")}
+    if isinstance(value, datetime):
+        return {"__t": "datetime", "v": value.isoformat()}
+    if isinstance(value, date):
+        return {"__t": "date", "v": value.isoformat()}
+    if np is not None:
+        if isinstance(value, np.generic):
+            return _to_data(value.item())
+        if isinstance(value, np.ndarray) and value.dtype.kind in "biufcUSM":
+            return {"__t": "ndarray", "dtype": value.dtype.str, "v": _to_data(value.tolist())}
+    raise TypeError(f"{type(value).__name__} can't be stored as data")
+
+def _from_data(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_from_data(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    tag = value.get("__t")
+    if tag is None:
+        return {k: _from_data(v) for k, v in value.items()}
+    if tag == "dict":
+        return {_from_data(k): _from_data(v) for k, v in value["items"]}
+    if tag in ("tuple", "set", "frozenset"):
+        return {"tuple": tuple, "set": set, "frozenset": frozenset}[tag](_from_data(v) for v in value["items"])
+    if tag == "timestamp":
+        return pd.Timestamp(value["v"])
+    if tag in ("frame", "series"):
+        frame = pd.read_parquet(io.BytesIO(base64.b64decode(value["v"])))
+        if tag == "frame":
+            return frame
+        series = frame.iloc[:, 0]
+        return series.rename(None) if series.name == "__series__" else series
+    if tag == "datetime":
+        return datetime.fromisoformat(value["v"])
+    if tag == "date":
+        return date.fromisoformat(value["v"])
+    if tag == "ndarray":
+        return np.array(_from_data(value["v"]), dtype=np.dtype(value["dtype"]))
+    raise ValueError(f"Unknown data tag: {tag}")
+
+class DataSerializer(Serializer):
+    """Data-only format (tagged JSON) for stores other processes can write to.
+
+    Covers what the app caches: containers, scalars, datetimes, numpy
+    values and pandas objects (as embedded Parquet). Loading never runs
+    code; other values raise TypeError instead of being stored.
+    """
+    name = "data"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(_to_data(value), separators=(",", ":")).encode("utf-8")
+
+    def loads(self, raw: bytes) -> Any:
+        return _from_data(json.loads(raw.decode("utf-8")))
+
+class JsonSerializer(Serializer):
+    """Human-readable, lossy format (non-JSON values become strings)."""
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, indent=2, default=str).encode("utf-8")
+
+    def loads(self, raw: bytes) -> Any:
+        return json.loads(raw.decode("utf-8"))
+
+SERIALIZERS = {s.name: s for s in (ParquetSerializer(), PickleSerializer(), DataSerializer(), JsonSerializer())}
+
+# Binary formats, tried in order; the first that accepts the value wins
+_BINARY_ORDER = ("parquet", "pickle")
+# Without pickle, for stores that aren't private to this app
+_DATA_ORDER = ("parquet", "data")
+
+def default_mode() -> str:
+    """'binary' unless CACHE_SERIALIZER=json is set for debugging."""
+    mode = os.environ.get("CACHE_SERIALIZER", "binary").lower()
+    return mode if mode in ("binary", "json") else "binary"
+
+def select_serializer(value: Any, mode: str = "binary", allow_pickle: bool = True) -> Serializer:
+    """Pick the serializer for a value."""
+    if mode == "json":
+        return SERIALIZERS["json"]
+    for name in (_BINARY_ORDER if allow_pickle else _DATA_ORDER):
+        serializer = SERIALIZERS[name]
+        if serializer.can_handle(value):
+            return serializer
+    return SERIALIZERS["pickle"]
+
+def loading_serializer(name: str, allow_pickle: bool = True) -> Serializer:
+    """The serializer that reads a stored format; pickle is refused unless allowed."""
+    if name == "pickle" and not allow_pickle:
+        raise ValueError("refusing to unpickle an entry from an untrusted store")
+    return SERIALIZERS[name]
+
+def file_extension(mode: str) -> str:
+    return ".json" if mode == "json" else ".bin"
+
+def encode_entry(data: Any, metadata: Dict[str, Any], mode: str = "binary") -> bytes:
+    """Encode a cache entry (value plus metadata such as timestamp/ttl)."""
+    if mode == "json":
+        # Same layout as the original JSON cache files
+        return SERIALIZERS["json"].dumps(dict(metadata, data=data))
+
+    serializer = select_serializer(data, mode)
+    header = json.dumps(dict(metadata, format=serializer.name), default=str).encode("utf-8")
+    return MAGIC + _HEADER_LEN.pack(len(header)) + header + serializer.dumps(data)
+
+def decode_entry(raw: bytes) -> Dict[str, Any]:
+    """Decode bytes produced by encode_entry (binary or JSON) into a dict with 'data'."""
+    if not raw.startswith(MAGIC):
+        return SERIALIZERS["json"].loads(raw)
+
+    offset = len(MAGIC)
+    (header_len,) = _HEADER_LEN.unpack_from(raw, offset)
+    offset += _HEADER_LEN.size
+    entry = json.loads(raw[offset:offset + header_len].decode("utf-8"))
+    serializer = SERIALIZERS[entry.pop("format")]
+    entry["data"] = serializer.loads(raw[offset + header_len:])
+    return entry
+
+def read_file_metadata(path: str) -> Dict[str, Any]:
+    """Read only an entry's metadata from a cache file (skips binary payloads)."""
+    with open(path, "rb") as f:
+        head = f.read(len(MAGIC) + _HEADER_LEN.size)
+        if head.startswith(MAGIC):
+            (header_len,) = _HEADER_LEN.unpack_from(head, len(MAGIC))
+            return json.loads(f.read(header_len).decode("utf-8"))
+        entry = SERIALIZERS["json"].loads(head + f.read())
+    entry.pop("data", None)
+    return entry
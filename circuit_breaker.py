@@ -0,0 +1,253 @@
+"""Circuit breakers and negative caching for failing symbols and data providers."""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from tiered_cache import make_key, tiered_cache
+from utils import get_logger
+
+logger = get_logger("circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+YFINANCE_PROVIDER = "yfinance"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit open for {name}; retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures.
+
+    While open, calls fail fast. Once the backoff has passed, one trial call
+    is let through (half-open): success closes the breaker, failure reopens
+    it for twice as long, up to max_backoff.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 2,
+                 base_backoff: float = 300, max_backoff: float = 24 * 3600):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.failures = 0  # consecutive failures while closed
+        self.trips = 0  # consecutive times opened; drives the backoff
+        self.open_until = 0.0
+        self.last_error: Optional[str] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self.trips == 0:
+            return CLOSED
+        return OPEN if time.time() < self.open_until else HALF_OPEN
+
+    def backoff(self) -> float:
+        """Seconds the breaker stays open after its current number of trips."""
+        return min(self.base_backoff * (2 ** max(self.trips - 1, 0)), self.max_backoff)
+
+    def retry_in(self) -> float:
+        with self._lock:
+            return max(self.open_until - time.time(), 0.0)
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now (claims the trial slot when half-open)."""
+        with self._lock:
+            state = self._state_locked()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """Give back a claimed trial slot without recording an outcome."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            reopened = self.trips > 0
+            self.failures = 0
+            self.trips = 0
+            self.open_until = 0.0
+            self.last_error = None
+            self._trial_running = False
+        if reopened:
+            logger.info(f"Circuit closed for {self.name}")
+            tiered_cache.delete(make_key("negative", self.name))
+
+    def record_failure(self, error: Any = None) -> None:
+        with self._lock:
+            self.last_error = str(error) if error is not None else "no data"
+            trial = self._trial_running
+            self._trial_running = False
+            if self._state_locked() == OPEN:
+                return  # a concurrent call already opened it
+            self.failures += 1
+            if not trial and self.failures < self.failure_threshold:
+                return
+            self.trips += 1
+            backoff = self.backoff()
+            self.open_until = time.time() + backoff
+            snapshot = self._snapshot_locked()
+        logger.warning(f"Circuit open for {self.name} for {backoff:.0f}s: {self.last_error}")
+        # Negative cache entry, so other processes and restarts skip the call too
+        tiered_cache.set(make_key("negative", self.name), snapshot, ttl=backoff)
+
+    def restore(self, snapshot: Dict[str, Any]) -> None:
+        """Resume an open state from a negative cache entry."""
+        with self._lock:
+            self.trips = snapshot.get('trips', 1)
+            self.failures = snapshot.get('failures', self.failure_threshold)
+            self.open_until = snapshot.get('open_until', 0.0)
+            self.last_error = snapshot.get('last_error')
+
+    def _snapshot_locked(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'state': self._state_locked(),
+            'failures': self.failures,
+            'trips': self.trips,
+            'open_until': self.open_until,
+            'retry_in': max(self.open_until - time.time(), 0.0),
+            'last_error': self.last_error
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._snapshot_locked()
+
+class BreakerRegistry:
+    """Per-symbol and per-provider breakers.
+
+    A symbol that keeps returning nothing (delisted, renamed) only trips its
+    own breaker. Exceptions also count against the provider, so an outage
+    or rate limit trips the provider breaker and stops calls for every symbol.
+    """
+
+    def __init__(self, symbol_threshold: int = 2, symbol_backoff: float = 300,
+                 symbol_max_backoff: float = 24 * 3600, provider_threshold: int = 5,
+                 provider_backoff: float = 30, provider_max_backoff: float = 600):
+        self.symbol_settings = (symbol_threshold, symbol_backoff, symbol_max_backoff)
+        self.provider_settings = (provider_threshold, provider_backoff, provider_max_backoff)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str, settings) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, *settings)
+                saved = tiered_cache.get(make_key("negative", name))
+                if saved:
+                    breaker.restore(saved)
+                self._breakers[name] = breaker
+            return breaker
+
+    def symbol(self, symbol: str) -> CircuitBreaker:
+        return self._get(f"symbol_{symbol}", self.symbol_settings)
+
+    def provider(self, provider: str) -> CircuitBreaker:
+        return self._get(f"provider_{provider}", self.provider_settings)
+
+    def is_open(self, provider: str, symbol: str) -> bool:
+        """True if calls for symbol would currently fail fast (doesn't claim a trial)."""
+        return any(b.state == OPEN for b in (self.provider(provider), self.symbol(symbol)))
+
+    def call(self, provider: str, symbol: str, fn: Callable[[], Any],
+             is_empty: Optional[Callable[[Any], bool]] = None, track_symbol: bool = True) -> Any:
+        """Call fn() through the provider and symbol breakers.
+
+        Raises CircuitOpenError without calling fn if either is open. An
+        empty result (per is_empty) counts as a failure for the symbol only.
+        With track_symbol=False the symbol breaker is only consulted, for
+        calls whose outcome says nothing about whether the symbol is valid.
+        """
+        provider_breaker = self.provider(provider)
+        symbol_breaker = self.symbol(symbol)
+        if track_symbol:
+            if not symbol_breaker.allow():
+                raise CircuitOpenError(symbol_breaker.name, symbol_breaker.retry_in())
+        elif symbol_breaker.state != CLOSED:
+            raise CircuitOpenError(symbol_breaker.name, symbol_breaker.retry_in())
+        if not provider_breaker.allow():
+            if track_symbol:
+                symbol_breaker.release()
+            raise CircuitOpenError(provider_breaker.name, provider_breaker.retry_in())
+
+        try:
+            result = fn()
+        except Exception as e:
+            provider_breaker.record_failure(e)
+            if track_symbol:
+                symbol_breaker.record_failure(e)
+            raise
+        provider_breaker.record_success()
+        if not track_symbol:
+            return result
+        if is_empty is not None and is_empty(result):
+            symbol_breaker.record_failure("no data")
+        else:
+            symbol_breaker.record_success()
+        return result
+
+    def record(self, symbol: str, ok: bool, error: Any = None) -> None:
+        """Record the outcome for a symbol fetched outside call() (e.g. in a batch)."""
+        breaker = self.symbol(symbol)
+        if ok:
+            breaker.record_success()
+        else:
+            breaker.record_failure(error)
+
+    def get_state(self, symbol: str) -> Dict[str, Any]:
+        return self.symbol(symbol).snapshot()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """State of every breaker that has seen a call."""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.name: b.snapshot() for b in breakers}
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Close one breaker (by full name) or all of them."""
+        with self._lock:
+            names = [name] if name else list(self._breakers)
+            for n in names:
+                self._breakers.pop(n, None)
+        tiered_cache.invalidate(namespace="negative", pattern=name)
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+# Global registry; backoffs are configurable via environment
+breakers = BreakerRegistry(
+    symbol_threshold=int(_env_float("BREAKER_SYMBOL_THRESHOLD", 2)),
+    symbol_backoff=_env_float("BREAKER_SYMBOL_BACKOFF", 300),
+    symbol_max_backoff=_env_float("BREAKER_SYMBOL_MAX_BACKOFF", 24 * 3600),
+    provider_threshold=int(_env_float("BREAKER_PROVIDER_THRESHOLD", 5)),
+    provider_backoff=_env_float("BREAKER_PROVIDER_BACKOFF", 30),
+    provider_max_backoff=_env_float("BREAKER_PROVIDER_MAX_BACKOFF", 600),
+)
+
+def get_breaker_state(symbol: str) -> Dict[str, Any]:
+    return breakers.get_state(symbol)
+
+def get_breaker_states() -> Dict[str, Dict[str, Any]]:
+    return breakers.snapshot()
@@ -1,7 +1,12 @@
 """Fetch news and price data for Indian stocks/indices."""
-import requests
 from bs4 import BeautifulSoup
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+from bar_store import bar_store, has_corporate_actions, period_start, supports_period
+from circuit_breaker import CircuitOpenError, YFINANCE_PROVIDER, breakers
+from headline_archive import archive_enabled, group_by_source, headline_archive
+from headline_extraction import get_spec
+from http_client import fetch, fetch_many, parse_once
 from utils import get_logger
 
 # Try to import yfinance; if not available, provide mock
@@ -22,57 +27,303 @@ NEWS_SOURCES = {
     "bse": "https://www.bseindia.com",
 }
 
-def fetch_page_headlines(url: str, css_select: str = "h2, h3, a") -> List[str]:
+def _parse_headlines(html: str, css_select: str) -> List[str]:
+    """Headlines for an arbitrary CSS selector (BeautifulSoup; slower than the specs)."""
+    soup = BeautifulSoup(html, "lxml")
+    elems = soup.select(css_select)
+    headlines = []
+    for e in elems:
+        txt = e.get_text(strip=True)
+        if txt and len(txt) > 20:
+            headlines.append(txt)
+    return headlines
+
+def fetch_page_headlines(url: str, css_select: Optional[str] = None, source: str = "default") -> List[str]:
+    """Headlines on a page, using the extraction spec for `source` unless css_select is given."""
+    result = fetch(url)
+    if not result.ok:
+        logger.error("Error fetching %s: %s", url, result.error)
+        return []
     try:
-        resp = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "lxml")
-        elems = soup.select(css_select)
-        headlines = []
-        for e in elems:
-            txt = e.get_text(strip=True)
-            if txt and len(txt) > 20:
-                headlines.append(txt)
+        if css_select:
+            headlines = parse_once(result, css_select, lambda html: _parse_headlines(html, css_select))
+        else:
+            spec = get_spec(source)
+            headlines = parse_once(result, spec.name, spec.extract)
         logger.info("Fetched %d headlines from %s", len(headlines), url)
         return headlines
     except Exception as e:
-        logger.exception("Error fetching %s: %s", url, e)
+        logger.exception("Error parsing %s: %s", url, e)
         return []
 
-def fetch_market_news() -> Dict[str, List[str]]:
+def fetch_market_news(deadline: Optional[float] = None) -> Dict[str, List[str]]:
+    """Headlines per source, fetched concurrently.
+
+    Sources that fail or haven't answered within `deadline` seconds
+    (HTTP_FETCH_DEADLINE by default) get an empty list.
+    """
+    results = fetch_many(NEWS_SOURCES.values(), deadline=deadline)
     out = {}
     for name, url in NEWS_SOURCES.items():
+        result = results[url]
+        if not result.ok:
+            out[name] = []
+            continue
+        spec = get_spec(name)
         try:
-            if name == "moneycontrol":
-                headlines = fetch_page_headlines(url, css_select=".srchResult, .clearfix h2, h3 a")
-            elif name == "economictimes":
-                headlines = fetch_page_headlines(url, css_select=".title, a, h2, h3")
-            elif name == "business_standard":
-                headlines = fetch_page_headlines(url, css_select="h2, h3, a")
-            else:
-                headlines = fetch_page_headlines(url)
+            # Unchanged pages (304 or same body) reuse the last parse
+            headlines = parse_once(result, spec.name, spec.extract)
+            logger.info("Fetched %d headlines from %s in %.2fs%s", len(headlines), url, result.elapsed,
+                        " (unchanged)" if result.not_modified else "")
             out[name] = headlines[:60]
-        except Exception:
+        except Exception as e:
+            logger.exception("Error parsing %s: %s", url, e)
             out[name] = []
+    if archive_enabled():
+        try:
+            headline_archive.ingest(out)
+        except Exception as e:
+            logger.error("Error archiving headlines: %s", e)
     return out
 
-def fetch_price(symbol: str, period: str = "1y", interval: str = "1d"):
+def fetch_market_news_delta(cursor: Optional[str] = None,
+                            deadline: Optional[float] = None) -> Tuple[Dict[str, List[str]], str]:
+    """Fetch news and return only headlines first seen after `cursor`, per source.
+
+    Returns (news, next_cursor); pass next_cursor on the next call. With no
+    cursor, the delta starts at the beginning of today's archive partition.
+    """
+    fetch_market_news(deadline=deadline)
+    records, next_cursor = headline_archive.read_since(cursor)
+    return group_by_source(records), next_cursor
+
+def _use_store(use_store: bool, period: str) -> bool:
+    """Whether to go through the bar store; periods it can't translate (e.g. "60d") download directly."""
+    if not (use_store and bar_store.enabled):
+        return False
+    if not supports_period(period):
+        logger.debug("Period %s not supported by the bar store; downloading directly", period)
+        return False
+    return True
+
+def fetch_price(symbol: str, period: str = "1y", interval: str = "1d", use_store: bool = True):
     if not YFINANCE_AVAILABLE:
         logger.warning("yfinance not installed; returning None for %s", symbol)
         return None
+    if _use_store(use_store, period):
+        return _fetch_price_via_store(symbol, period, interval)
     try:
         ticker = yf.Ticker(symbol)
-        df = ticker.history(period=period, interval=interval)
+        df = breakers.call(
+            YFINANCE_PROVIDER, symbol,
+            lambda: ticker.history(period=period, interval=interval),
+            is_empty=lambda frame: frame.empty
+        )
         if df.empty:
             logger.warning("No data for %s", symbol)
         return df
+    except CircuitOpenError as e:
+        logger.warning("Skipping %s: %s", symbol, e)
+        return None
     except Exception as e:
         logger.exception("Error fetching price for %s: %s", symbol, e)
         return None
 
-def fetch_multiple_prices(symbols: List[str], period: str = "1y"):
+def _stored_since(symbol: str, interval: str, start):
+    """Newest stored bar time to resume downloading from, or None if the store can't serve this period."""
+    if not bar_store.covers(symbol, interval, start):
+        return None
+    return bar_store.last_timestamp(symbol, interval)
+
+def _fetch_price_via_store(symbol: str, period: str, interval: str):
+    """Serve history from the bar store, downloading only bars after the last stored one.
+
+    A dividend or split among the new bars changes the adjustment of all
+    earlier ones, so the symbol's history is downloaded again instead.
+    """
+    start = period_start(period)
+    last_ts = _stored_since(symbol, interval, start)
+    try:
+        ticker = yf.Ticker(symbol)
+        if last_ts is not None:
+            # No new bars isn't a failure (e.g. a holiday), so is_empty isn't checked here
+            delta = breakers.call(
+                YFINANCE_PROVIDER, symbol,
+                lambda: ticker.history(start=last_ts.strftime("%Y-%m-%d"), interval=interval)
+            )
+            if has_corporate_actions(delta, last_ts):
+                logger.info("Corporate action for %s; re-downloading adjusted history", symbol)
+                last_ts = None
+            else:
+                bar_store.append(symbol, interval, delta)
+        if last_ts is None:
+            df = breakers.call(
+                YFINANCE_PROVIDER, symbol,
+                lambda: ticker.history(period=period, interval=interval),
+                is_empty=lambda frame: frame.empty
+            )
+            if df.empty:
+                logger.warning("No data for %s", symbol)
+                return df
+            bar_store.replace(symbol, interval, df)
+            bar_store.mark_backfilled(symbol, interval, start)
+    except CircuitOpenError as e:
+        logger.warning("Skipping download for %s: %s", symbol, e)
+        if last_ts is None:
+            return None
+    except Exception as e:
+        logger.exception("Error fetching price for %s: %s", symbol, e)
+        if last_ts is None:
+            return None
+    return bar_store.read(symbol, interval, start=start)
+
+def _split_batch_frame(frame, symbols: List[str]) -> Dict[str, Optional[object]]:
+    """Split a grouped yf.download frame into one DataFrame per symbol."""
+    out = {}
+    multi = getattr(frame.columns, "nlevels", 1) > 1
+    for s in symbols:
+        if multi:
+            if s not in frame.columns.get_level_values(0):
+                out[s] = None
+                continue
+            df = frame[s]
+        elif len(symbols) == 1:
+            df = frame
+        else:
+            out[s] = None
+            continue
+        df = df.dropna(how="all")
+        out[s] = df if not df.empty else None
+    return out
+
+def _download_chunk(chunk: List[str], period: str, interval: str,
+                    start: Optional[str] = None) -> Dict[str, Optional[object]]:
+    # An explicit start date takes precedence over the period
+    window = {"start": start} if start else {"period": period}
+    try:
+        frame = yf.download(
+            chunk,
+            interval=interval,
+            **window,
+            group_by="ticker",
+            auto_adjust=True,
+            actions=True,
+            threads=False,
+            progress=False,
+        )
+    except Exception as e:
+        logger.exception("Error downloading batch %s: %s", chunk, e)
+        breakers.provider(YFINANCE_PROVIDER).record_failure(e)
+        return {s: None for s in chunk}
+    breakers.provider(YFINANCE_PROVIDER).record_success()
+    if frame is None or frame.empty:
+        out = {s: None for s in chunk}
+    else:
+        out = _split_batch_frame(frame, chunk)
+    if not start:
+        # A full-period request that returns nothing means a bad symbol
+        for s, df in out.items():
+            breakers.record(s, df is not None)
+    return out
+
+def download_price_batches(symbols: List[str], period: str = "1y", interval: str = "1d",
+                           chunk_size: int = 50, max_workers: int = 4,
+                           start: Optional[str] = None) -> Tuple[Dict[str, Optional[object]], List[str]]:
+    """Download history for many symbols with one bulk request per chunk.
+
+    Chunks run in parallel; symbols with an open circuit breaker are not
+    requested. Returns ({symbol: DataFrame or None}, failed_symbols).
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not YFINANCE_AVAILABLE:
+        logger.warning("yfinance not installed; returning None for %d symbols", len(symbols))
+        return {s: None for s in symbols}, symbols
+    # Known-bad symbols (open circuit breaker) are left out of the requests
+    skipped = [s for s in symbols if breakers.is_open(YFINANCE_PROVIDER, s)]
+    if skipped:
+        logger.info("Skipping %d symbols with open circuit breakers: %s", len(skipped), skipped)
+    requested = [s for s in symbols if s not in skipped]
+    chunks = [requested[i:i + chunk_size] for i in range(0, len(requested), chunk_size)]
+    data = {s: None for s in symbols}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks) or 1))) as pool:
+        for result in pool.map(lambda c: _download_chunk(c, period, interval, start), chunks):
+            data.update(result)
+    failed = [s for s in symbols if data.get(s) is None]
+    return data, failed
+
+def _resume_buckets(resume: Dict[str, object], max_spread_days: int = 5) -> List[Tuple[str, List[str]]]:
+    """Group symbols by resume time into (start date, symbols) download buckets.
+
+    A bucket spans at most max_spread_days, so one stale symbol doesn't push
+    every other symbol's download back to its date.
+    """
+    buckets = []
+    for s in sorted(resume, key=lambda sym: resume[sym]):
+        if buckets and (resume[s] - buckets[-1][0]).days <= max_spread_days:
+            buckets[-1][1].append(s)
+        else:
+            buckets.append((resume[s], [s]))
+    return [(oldest.strftime("%Y-%m-%d"), bucket) for oldest, bucket in buckets]
+
+def _fetch_multiple_via_store(symbols: List[str], period: str, interval: str,
+                              chunk_size: int, max_workers: int) -> Tuple[Dict[str, Optional[object]], List[str]]:
+    """Batched variant of _fetch_price_via_store."""
+    start = period_start(period)
+    resume = {s: _stored_since(s, interval, start) for s in symbols}
+    stored = [s for s, last_ts in resume.items() if last_ts is not None]
+    failed = []
+
+    readjust = []
+    for since, bucket in _resume_buckets({s: resume[s] for s in stored}):
+        # Overlapping bars are de-duplicated by the store
+        delta, delta_failed = download_price_batches(
+            bucket, interval=interval, chunk_size=chunk_size, max_workers=max_workers, start=since
+        )
+        failed += delta_failed
+        for s, df in delta.items():
+            if has_corporate_actions(df, resume[s]):
+                readjust.append(s)
+            elif df is not None:
+                bar_store.append(s, interval, df)
+    if readjust:
+        logger.info("Corporate actions for %s; re-downloading adjusted history", readjust)
+
+    # Never stored, or stored with an adjustment that is now stale
+    missing = [s for s, last_ts in resume.items() if last_ts is None] + readjust
+    if missing:
+        full, full_failed = download_price_batches(
+            missing, period=period, interval=interval, chunk_size=chunk_size, max_workers=max_workers
+        )
+        failed += full_failed
+        for s, df in full.items():
+            if df is not None:
+                bar_store.replace(s, interval, df)
+                bar_store.mark_backfilled(s, interval, start)
+
+    data = {s: bar_store.read(s, interval, start=start) for s in symbols}
+    return data, failed
+
+def fetch_multiple_prices(symbols: List[str], period: str = "1y", interval: str = "1d",
+                          batched: bool = True, chunk_size: int = 50, max_workers: int = 4,
+                          use_store: bool = True, return_failed: bool = False):
+    """Price history for many symbols as {symbol: DataFrame or None}.
+
+    With return_failed, returns (data, failed_symbols) instead, so callers
+    can retry or report the symbols that got no new data.
+    """
+    if batched and YFINANCE_AVAILABLE:
+        if _use_store(use_store, period):
+            data, failed = _fetch_multiple_via_store(symbols, period, interval, chunk_size, max_workers)
+        else:
+            data, failed = download_price_batches(
+                symbols, period=period, interval=interval, chunk_size=chunk_size, max_workers=max_workers
+            )
+        if failed:
+            logger.warning("No new price data for %d/%d symbols: %s", len(failed), len(data), failed)
+        return (data, failed) if return_failed else data
     data = {}
     for s in symbols:
-        data[s] = fetch_price(s, period=period)
+        data[s] = fetch_price(s, period=period, interval=interval, use_store=use_store)
+    if return_failed:
+        return data, [s for s, df in data.items() if df is None or df.empty]
     return data
-
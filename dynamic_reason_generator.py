@@ -1,15 +1,21 @@
 """Dynamic reason generator based on real news and Google search results."""
-import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import json
 import re
 from datetime import datetime, timedelta
+from fast_cache import CACHE_KEYS, cached_fetch
+from headline_extraction import HEADLINE_SPECS
+from http_client import fetch_many, parse_once
+from text_matcher import MultiPatternMatcher
 from utils import get_logger
 import random
 
 logger = get_logger("dynamic_reason_generator")
 
+# News trends snapshot lifetime, and how much longer a stale one may be served while refreshing
+TRENDS_MAX_AGE_HOURS = 0.5
+TRENDS_STALE_HOURS = 2
+
 class DynamicReasonGenerator:
     def __init__(self):
         self.news_keywords = {
@@ -41,102 +47,117 @@ class DynamicReasonGenerator:
             'retail': ['RELIANCE.NS', 'DMART.NS', 'AVENUE.NS', 'TRENT.NS'],
             'infrastructure': ['LT.NS', 'ULTRACEMCO.NS', 'ACC.NS', 'AMBUJACEM.NS']
         }
+        
+        self.sentiment_keywords = {
+            'positive': [
+                'rise', 'gain', 'profit', 'growth', 'boom', 'surge', 'jump', 'rally', 'bull',
+                'positive', 'good', 'strong', 'up', 'increase', 'boost', 'win', 'success',
+                'record high', 'all-time high', 'breakthrough', 'achievement', 'award'
+            ],
+            'negative': [
+                'fall', 'drop', 'loss', 'decline', 'crash', 'bear', 'down', 'decrease',
+                'negative', 'bad', 'weak', 'slump', 'plunge', 'tumble', 'crisis', 'fraud',
+                'scam', 'investigation', 'concern', 'worry', 'fear', 'panic', 'sell-off'
+            ]
+        }
+        
+        self.sector_keywords = {
+            'bank': ['bank', 'rbi', 'interest', 'loan', 'credit', 'finance'],
+            'it': ['tech', 'software', 'digital', 'ai', 'it', 'computer'],
+            'pharma': ['medicine', 'drug', 'pharma', 'health', 'hospital', 'vaccine'],
+            'auto': ['car', 'auto', 'vehicle', 'motor', 'electric vehicle'],
+            'energy': ['oil', 'energy', 'power', 'petrol', 'diesel', 'crude'],
+            'retail': ['retail', 'consumer', 'shopping', 'marketplace', 'fmcg'],
+            'infrastructure': ['construction', 'infrastructure', 'project', 'building'],
+            'agriculture': ['farm', 'crop', 'monsoon', 'agriculture', 'rural'],
+            'festival': ['festival', 'pongal', 'diwali', 'eid', 'celebration']
+        }
+        
+        # Compiled once; keywords match at word starts ('gain' -> 'gains'),
+        # short ones only as whole words ('it' not in 'profit', 'up' not in 'update')
+        self._sentiment_matcher = self._compile_keywords(self.sentiment_keywords)
+        self._sector_matcher = self._compile_keywords(self.sector_keywords)
+    
+    @staticmethod
+    def _compile_keywords(keywords: Dict[str, List[str]]) -> MultiPatternMatcher:
+        matcher = MultiPatternMatcher(boundary="start")
+        for label, words in keywords.items():
+            for word in words:
+                matcher.add(word, label, boundary="word" if len(word) <= 2 else None)
+        return matcher
     
     def get_current_news_trends(self) -> Dict[str, List[str]]:
-        """Get current news trends and events from multiple sources."""
+        """Get current news trends, from a snapshot shared by all callers.
+        
+        The snapshot is cached for TRENDS_MAX_AGE_HOURS; a somewhat older one
+        is served while it is refreshed in the background.
+        """
+        trends = cached_fetch(
+            CACHE_KEYS['news_trends'], self.fetch_news_trends, TRENDS_MAX_AGE_HOURS,
+            stale_window_hours=TRENDS_STALE_HOURS
+        )
+        if not trends:
+            # Not cached, so the next call tries the sources again
+            trends = self._generate_fallback_trends()
+        return trends
+    
+    def fetch_news_trends(self) -> Dict[str, List[str]]:
+        """Scrape news sources and categorize their headlines.
+        
+        Raises if no headlines could be fetched, so the failure isn't cached.
+        """
         trends = {
             'positive_events': [],
             'negative_events': [],
             'neutral_events': []
         }
         
-        try:
-            # Fetch from multiple Indian news sources
-            news_sources = [
-                'https://www.economictimes.indiatimes.com/markets',
-                'https://www.moneycontrol.com/news/business/markets/',
-                'https://www.business-standard.com/markets',
-                'https://www.livemint.com/market/'
-            ]
-            
-            for source in news_sources:
-                try:
-                    response = requests.get(source, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        
-                        # Extract headlines
-                        headlines = self._extract_headlines(soup)
-                        
-                        # Categorize headlines
-                        for headline in headlines:
-                            category = self._categorize_news(headline)
-                            if category == 'positive':
-                                trends['positive_events'].append(headline)
-                            elif category == 'negative':
-                                trends['negative_events'].append(headline)
-                            else:
-                                trends['neutral_events'].append(headline)
-                
-                except Exception as e:
-                    logger.error(f"Error fetching from {source}: {e}")
-                    continue
-            
-            # If no real news, generate based on current date/events
-            if not any(trends.values()):
-                trends = self._generate_fallback_trends()
-            
-        except Exception as e:
-            logger.error(f"Error in get_current_news_trends: {e}")
-            trends = self._generate_fallback_trends()
-        
-        return trends
-    
-    def _extract_headlines(self, soup: BeautifulSoup) -> List[str]:
-        """Extract headlines from soup object."""
-        headlines = []
-        
-        # Common selectors for headlines
-        selectors = [
-            'h1', 'h2', 'h3',
-            '.title', '.headline', '.news-title',
-            'a[title*="news"]', 'a[title*="market"]',
-            '[class*="headline"]', '[class*="title"]'
+        # Fetch from multiple Indian news sources
+        news_sources = [
+            'https://www.economictimes.indiatimes.com/markets',
+            'https://www.moneycontrol.com/news/business/markets/',
+            'https://www.business-standard.com/markets',
+            'https://www.livemint.com/market/'
         ]
         
-        for selector in selectors:
+        # Fetched concurrently; sources still slow at the deadline are skipped
+        results = fetch_many(news_sources)
+        for source in news_sources:
+            result = results[source]
+            if not result.ok:
+                continue
             try:
-                elements = soup.select(selector)
-                for element in elements[:20]:  # Limit to avoid too many
-                    text = element.get_text(strip=True)
-                    if len(text) > 15 and len(text) < 200:  # Reasonable length
-                        headlines.append(text)
-            except Exception:
+                # Extract headlines (reused as-is when the page hasn't changed)
+                headlines = parse_once(result, 'trends', self._extract_headlines)
+                
+                # Categorize headlines
+                for headline in headlines:
+                    category = self._categorize_news(headline)
+                    if category == 'positive':
+                        trends['positive_events'].append(headline)
+                    elif category == 'negative':
+                        trends['negative_events'].append(headline)
+                    else:
+                        trends['neutral_events'].append(headline)
+            
+            except Exception as e:
+                logger.error(f"Error parsing {source}: {e}")
                 continue
         
-        return headlines[:50]  # Return top 50 headlines
+        if not any(trends.values()):
+            raise RuntimeError("No headlines fetched from any news source")
+        return trends
+    
+    def _extract_headlines(self, html: str) -> List[str]:
+        """Extract headlines from a page (see the 'trends' spec in headline_extraction)."""
+        return HEADLINE_SPECS['trends'].extract(html)
     
     def _categorize_news(self, headline: str) -> str:
         """Categorize news as positive, negative, or neutral."""
-        headline_lower = headline.lower()
-        
-        # Positive keywords
-        positive_keywords = [
-            'rise', 'gain', 'profit', 'growth', 'boom', 'surge', 'jump', 'rally', 'bull',
-            'positive', 'good', 'strong', 'up', 'increase', 'boost', 'win', 'success',
-            'record high', 'all-time high', 'breakthrough', 'achievement', 'award'
-        ]
-        
-        # Negative keywords
-        negative_keywords = [
-            'fall', 'drop', 'loss', 'decline', 'crash', 'bear', 'down', 'decrease',
-            'negative', 'bad', 'weak', 'slump', 'plunge', 'tumble', 'crisis', 'fraud',
-            'scam', 'investigation', 'concern', 'worry', 'fear', 'panic', 'sell-off'
-        ]
-        
-        # Check sentiment
-        positive_count = sum(1 for word in positive_keywords if word in headline_lower)
-        negative_count = sum(1 for word in negative_keywords if word in headline_lower)
+        # Distinct keywords of each kind, found in one pass
+        counts = self._sentiment_matcher.count_by_label(headline)
+        positive_count = counts.get('positive', 0)
+        negative_count = counts.get('negative', 0)
         
         if positive_count > negative_count:
             return 'positive'
@@ -194,10 +215,21 @@ class DynamicReasonGenerator:
     
     def generate_dynamic_reason(self, stock_symbol: str, score: float, category: str) -> str:
         """Generate dynamic reason based on current news and stock type."""
+        return self.generate_dynamic_reasons([(stock_symbol, score, category)])[0]
+    
+    def generate_dynamic_reasons(self, items: List[Tuple[str, float, str]]) -> List[str]:
+        """Generate reasons for many (symbol, score, category) items from one trends snapshot."""
+        if not items:
+            return []
         try:
-            # Get current trends
             trends = self.get_current_news_trends()
-            
+        except Exception as e:
+            logger.error(f"Error getting news trends: {e}")
+            trends = self._generate_fallback_trends()
+        return [self._reason_from_trends(trends, symbol, score) for symbol, score, _ in items]
+    
+    def _reason_from_trends(self, trends: Dict[str, List[str]], stock_symbol: str, score: float) -> str:
+        try:
             # Determine stock sector
             stock_sector = self._identify_stock_sector(stock_symbol)
             
@@ -265,22 +297,7 @@ class DynamicReasonGenerator:
     
     def _is_event_relevant_to_sector(self, event: str, sector: str) -> bool:
         """Check if an event is relevant to a specific sector."""
-        event_lower = event.lower()
-        
-        sector_keywords = {
-            'bank': ['bank', 'rbi', 'interest', 'loan', 'credit', 'finance'],
-            'it': ['tech', 'software', 'digital', 'ai', 'it', 'computer'],
-            'pharma': ['medicine', 'drug', 'pharma', 'health', 'hospital', 'vaccine'],
-            'auto': ['car', 'auto', 'vehicle', 'motor', 'electric vehicle'],
-            'energy': ['oil', 'energy', 'power', 'petrol', 'diesel', 'crude'],
-            'retail': ['retail', 'consumer', 'shopping', 'marketplace', 'fmcg'],
-            'infrastructure': ['construction', 'infrastructure', 'project', 'building'],
-            'agriculture': ['farm', 'crop', 'monsoon', 'agriculture', 'rural'],
-            'festival': ['festival', 'pongal', 'diwali', 'eid', 'celebration']
-        }
-        
-        keywords = sector_keywords.get(sector, [])
-        return any(keyword in event_lower for keyword in keywords)
+        return sector in self._sector_matcher.labels(event)
     
     def _format_user_friendly_reason(self, event: str, stock_symbol: str, sector: str) -> str:
         """Format event into user-friendly reason."""
@@ -354,3 +371,7 @@ dynamic_reason_generator = DynamicReasonGenerator()
 def get_dynamic_reason(stock_symbol: str, score: float, category: str) -> str:
     """Get dynamic reason for a stock."""
     return dynamic_reason_generator.generate_dynamic_reason(stock_symbol, score, category)
+
+def get_dynamic_reasons(items: List[Tuple[str, float, str]]) -> List[str]:
+    """Get dynamic reasons for many (symbol, score, category) items at once."""
+    return dynamic_reason_generator.generate_dynamic_reasons(items)
@@ -5,7 +5,9 @@ from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
 from realtime_data import get_index_data, get_stock_data, data_fetcher
 from data_fetcher import fetch_market_news
+from headline_dedup import unique_headlines
 from sentiment_analysis import analyze_headlines
+from text_matcher import get_symbol_matcher
 from utils import get_logger
 import random
 
@@ -39,6 +41,7 @@ class EnhancedIntradayPredictor:
         ]
         
         self.all_stocks = self.regular_stocks + self.penny_stocks
+        self._symbol_matcher = get_symbol_matcher(self.all_stocks)
     
     def predict_intraday_tables(self) -> Dict[str, List[Dict]]:
         """Generate 3 separate tables for intraday predictions."""
@@ -260,9 +263,8 @@ class EnhancedIntradayPredictor:
         """Analyze market news for sentiment."""
         try:
             news = fetch_market_news()
-            combined_headlines = []
-            for src, headlines in news.items():
-                combined_headlines.extend(headlines[:20])
+            # One headline per story, so repeats across sources don't weight the average
+            combined_headlines = unique_headlines({src: headlines[:20] for src, headlines in news.items()})
             
             if not combined_headlines:
                 return {}
@@ -272,16 +274,13 @@ class EnhancedIntradayPredictor:
             # Create sentiment map for stocks mentioned in news
             sentiment_map = {}
             for sentiment in sentiments:
-                text = sentiment["text"].lower()
                 compound = sentiment.get("compound", 0)
                 
-                # Check for stock mentions
-                for stock in self.all_stocks:
-                    stock_name = stock.replace(".NS", "").lower()
-                    if stock_name in text:
-                        if stock not in sentiment_map:
-                            sentiment_map[stock] = []
-                        sentiment_map[stock].append(compound)
+                # Check for stock mentions (tickers and company names, in one pass)
+                for stock in self._symbol_matcher.labels(sentiment["text"]):
+                    if stock not in sentiment_map:
+                        sentiment_map[stock] = []
+                    sentiment_map[stock].append(compound)
             
             # Calculate average sentiment per stock
             avg_sentiment = {}
@@ -1,98 +1,145 @@
 """Fast caching system for optimized loading times."""
-import json
-import os
-import time
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, NamedTuple, Optional, Tuple
+from tiered_cache import TieredCache, make_key, tiered_cache
+from single_flight import SingleFlight, process_locks_enabled
 from utils import get_logger
 
 logger = get_logger("fast_cache")
 
 class FastCache:
-    def __init__(self, cache_dir: str = "fast_cache"):
-        self.cache_dir = cache_dir
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
+    """Age-checked cache for cached_fetch, stored in the tiered cache's "fast" namespace."""
+    
+    NAMESPACE = "fast"
+    
+    def __init__(self, tiered: Optional[TieredCache] = None):
+        self.tiered = tiered or tiered_cache
+    
+    def _key(self, key: str) -> str:
+        return make_key(self.NAMESPACE, key)
+    
+    def get_entry(self, key: str) -> Optional[Tuple[Any, datetime]]:
+        """Get (data, cached_at) regardless of age, or None if nothing is cached."""
+        return self.tiered.get_entry(self._key(key))
     
     def get(self, key: str, max_age_hours: int = 24) -> Optional[Any]:
         """Get cached data if available and not too old."""
-        cache_file = os.path.join(self.cache_dir, f"{key}.json")
-        
-        if not os.path.exists(cache_file):
-            return None
-        
-        try:
-            with open(cache_file, 'r') as f:
-                cache_data = json.load(f)
-            
-            # Check age
-            cache_time = datetime.fromisoformat(cache_data.get('timestamp', '1970-01-01'))
-            age = datetime.now() - cache_time
-            
-            if age > timedelta(hours=max_age_hours):
-                logger.info(f"Cache expired for {key}")
-                os.remove(cache_file)
-                return None
-            
+        data = self.tiered.get(self._key(key), max_age=max_age_hours * 3600)
+        if data is not None:
             logger.debug(f"Cache hit for {key}")
-            return cache_data['data']
-            
-        except Exception as e:
-            logger.error(f"Error reading cache {key}: {e}")
-            try:
-                os.remove(cache_file)
-            except:
-                pass
-            return None
+        return data
     
     def set(self, key: str, data: Any) -> None:
         """Set data in cache."""
-        cache_file = os.path.join(self.cache_dir, f"{key}.json")
-        
-        try:
-            cache_data = {
-                'data': data,
-                'timestamp': datetime.now().isoformat(),
-                'key': key
-            }
-            
-            with open(cache_file, 'w') as f:
-                json.dump(cache_data, f, indent=2, default=str)
-            
-            logger.debug(f"Cached data for {key}")
-            
-        except Exception as e:
-            logger.error(f"Error writing cache {key}: {e}")
+        # Age is checked by the reader; the namespace TTL only bounds retention
+        self.tiered.set(self._key(key), data)
+        logger.debug(f"Cached data for {key}")
     
     def clear(self, pattern: Optional[str] = None) -> None:
         """Clear cache entries."""
-        try:
-            for filename in os.listdir(self.cache_dir):
-                if pattern is None or pattern in filename:
-                    os.remove(os.path.join(self.cache_dir, filename))
-            
-            logger.info(f"Cleared cache: {pattern or 'all'}")
-        except Exception as e:
-            logger.error(f"Error clearing cache: {e}")
+        self.tiered.invalidate(namespace=self.NAMESPACE, pattern=pattern)
 
 # Global cache instance
 fast_cache = FastCache()
 
-def cached_fetch(key: str, fetch_func, max_age_hours: int = 1, *args, **kwargs):
-    """Generic cached fetch function."""
-    # Try to get from cache
-    cached_data = fast_cache.get(key, max_age_hours)
-    if cached_data is not None:
-        return cached_data
+# Coalesces concurrent misses; CACHE_PROCESS_LOCKS=1 extends this across worker processes
+fetch_flight = SingleFlight(
+    lock_dir=f"{tiered_cache.cache_dir}_locks" if process_locks_enabled() else None
+)
+
+class CachedResult(NamedTuple):
+    """A cached_fetch value plus how fresh it is, for display in the UI."""
+    data: Any
+    fresh: bool
+    age_seconds: float
+    refreshing: bool
+
+# Background refreshes for stale-while-revalidate; at most one per key
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+def _fetch_and_store(key: str, fetch_func, args: tuple, kwargs: Dict,
+                     max_age_hours: Optional[float] = None):
+    """Fetch and cache a value, sharing the work with concurrent callers for key.
     
-    # Fetch fresh data
-    try:
+    With max_age_hours set, an entry written meanwhile by another caller
+    (or process) that is still that fresh is returned instead of refetching.
+    """
+    def fetch():
         fresh_data = fetch_func(*args, **kwargs)
         fast_cache.set(key, fresh_data)
         return fresh_data
+    
+    recheck = None
+    if max_age_hours is not None:
+        recheck = lambda: fast_cache.get(key, max_age_hours)
+    return fetch_flight.do(key, fetch, recheck=recheck)
+
+def _background_refresh(key: str, fetch_func, args: tuple, kwargs: Dict) -> None:
+    try:
+        _fetch_and_store(key, fetch_func, args, kwargs)
+        logger.info(f"Background refresh finished for {key}")
+    except Exception as e:
+        logger.error(f"Background refresh failed for {key}: {e}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+
+def schedule_refresh(key: str, fetch_func, *args, **kwargs) -> bool:
+    """Refresh a key in the background. Returns False if one is already running."""
+    with _refreshing_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+    _refresh_executor.submit(_background_refresh, key, fetch_func, args, kwargs)
+    return True
+
+def refresh(key: str, fetch_func, *args, **kwargs):
+    """Fetch and cache a value now, whatever the age of the cached entry."""
+    return _fetch_and_store(key, fetch_func, args, kwargs)
+
+def is_refreshing(key: str) -> bool:
+    with _refreshing_lock:
+        return key in _refreshing
+
+def cached_fetch_with_status(key: str, fetch_func, max_age_hours: float = 1, *args,
+                             stale_window_hours: Optional[float] = None, **kwargs) -> CachedResult:
+    """Cached fetch that also reports freshness.
+    
+    With stale_window_hours set, an entry older than max_age_hours but
+    within max_age_hours + stale_window_hours is returned immediately
+    (fresh=False) while it is refreshed in the background.
+    """
+    entry = fast_cache.get_entry(key)
+    if entry is not None and entry[0] is not None:
+        data, cache_time = entry
+        age_seconds = (datetime.now() - cache_time).total_seconds()
+        max_age_seconds = max_age_hours * 3600
+        if age_seconds <= max_age_seconds:
+            logger.debug(f"Cache hit for {key}")
+            return CachedResult(data, True, age_seconds, is_refreshing(key))
+        if stale_window_hours and age_seconds <= max_age_seconds + stale_window_hours * 3600:
+            logger.info(f"Serving stale {key} ({age_seconds:.0f}s old) while refreshing")
+            schedule_refresh(key, fetch_func, *args, **kwargs)
+            return CachedResult(data, False, age_seconds, True)
+    
+    # Fetch fresh data
+    try:
+        data = _fetch_and_store(key, fetch_func, args, kwargs, max_age_hours=max_age_hours)
+        return CachedResult(data, True, 0.0, False)
     except Exception as e:
         logger.error(f"Error in cached_fetch for {key}: {e}")
-        return None
+        return CachedResult(None, False, 0.0, False)
+
+def cached_fetch(key: str, fetch_func, max_age_hours: int = 1, *args,
+                 stale_window_hours: Optional[float] = None, **kwargs):
+    """Generic cached fetch function."""
+    return cached_fetch_with_status(
+        key, fetch_func, max_age_hours, *args, stale_window_hours=stale_window_hours, **kwargs
+    ).data
 
 # Predefined cache keys
 CACHE_KEYS = {
@@ -100,5 +147,6 @@ CACHE_KEYS = {
     'index_predictions': 'index_predictions',
     'stock_predictions': 'stock_predictions',
     'news_sentiment': 'news_sentiment',
+    'news_trends': 'news_trends',
     'market_summary': 'market_summary'
 }
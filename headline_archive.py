@@ -0,0 +1,160 @@
+"""Append-only archive of every headline seen, one JSONL partition per day (IST).
+
+Each record is {"hash", "text", "source", "first_seen"}; a headline is
+archived once, the first time any source carries it. Readers keep a cursor
+("YYYY-MM-DD:<byte offset>") and ask only for what was archived after it.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from headline_dedup import canonical_text
+from market_calendar import IST
+from single_flight import FileLock
+from utils import get_logger
+
+logger = get_logger("headline_archive")
+
+def headline_hash(text: str) -> str:
+    """Content hash of a headline, insensitive to case, punctuation and spacing."""
+    return hashlib.sha1(canonical_text(text).encode("utf-8")).hexdigest()
+
+def make_cursor(day: str, offset: int) -> str:
+    return f"{day}:{offset}"
+
+def parse_cursor(cursor: str) -> Tuple[str, int]:
+    day, _, offset = cursor.rpartition(":")
+    if not day:
+        raise ValueError(f"Invalid headline cursor: {cursor!r}")
+    return day, int(offset)
+
+class HeadlineArchive:
+    """Day-partitioned headline history under `root`.
+
+    Headlines already archived within the last dedupe_days are not added
+    again. Writers in several processes serialize on a lock file and catch
+    up on each other's appends before writing.
+    """
+
+    def __init__(self, root: str = "headline_archive", dedupe_days: int = 7):
+        self.root = root
+        self.dedupe_days = dedupe_days
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(os.path.join(root, ".lock"))
+        self._seen: Dict[str, str] = {}  # hash -> partition day
+        self._indexed: Dict[str, int] = {}  # partition day -> bytes already indexed
+
+    @staticmethod
+    def today() -> str:
+        return datetime.now(IST).strftime("%Y-%m-%d")
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.root, f"{day}.jsonl")
+
+    def partitions(self) -> List[str]:
+        """Archived days, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name[:-6] for name in os.listdir(self.root) if name.endswith(".jsonl"))
+
+    def _read_from(self, day: str, offset: int) -> Tuple[List[Dict], int]:
+        """Complete records in a partition after byte offset, and the offset after them."""
+        path = self._path(day)
+        if not os.path.exists(path):
+            return [], offset
+        records = []
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # a write still in progress
+                offset += len(line)
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"Skipping corrupt record in {path} at byte {offset - len(line)}")
+        return records, offset
+
+    def _refresh_index(self) -> None:
+        """Index hashes appended (by anyone) to the partitions inside the dedupe window."""
+        oldest = (datetime.now(IST) - timedelta(days=self.dedupe_days)).strftime("%Y-%m-%d")
+        for day in list(self._indexed):
+            if day < oldest:
+                del self._indexed[day]
+        self._seen = {h: day for h, day in self._seen.items() if day >= oldest}
+        for day in self.partitions():
+            if day < oldest:
+                continue
+            records, self._indexed[day] = self._read_from(day, self._indexed.get(day, 0))
+            for record in records:
+                self._seen.setdefault(record["hash"], day)
+
+    def ingest(self, news: Dict[str, List[str]], seen_at: Optional[datetime] = None) -> List[Dict]:
+        """Archive the headlines in {source: [headlines]} not seen before; returns the new records."""
+        seen_at = (seen_at or datetime.now(IST)).astimezone(IST)
+        day = seen_at.strftime("%Y-%m-%d")
+        first_seen = seen_at.isoformat(timespec="seconds")
+        with self._lock, self._file_lock:
+            self._refresh_index()
+            new = []
+            for source, headlines in news.items():
+                for text in headlines:
+                    text = " ".join(text.split())
+                    if not canonical_text(text):
+                        continue
+                    digest = headline_hash(text)
+                    if digest in self._seen:
+                        continue
+                    self._seen[digest] = day
+                    new.append({"hash": digest, "text": text, "source": source, "first_seen": first_seen})
+            if new:
+                os.makedirs(self.root, exist_ok=True)
+                data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in new).encode("utf-8")
+                with open(self._path(day), "ab") as f:
+                    f.write(data)
+                # Our own append is already in _seen
+                self._indexed[day] = self._indexed.get(day, 0) + len(data)
+        if new:
+            logger.info(f"Archived {len(new)} new headlines")
+        return new
+
+    def read_since(self, cursor: Optional[str] = None) -> Tuple[List[Dict], str]:
+        """Records archived after cursor (None: since the start of today), and the cursor to pass next."""
+        day, offset = parse_cursor(cursor) if cursor else (self.today(), 0)
+        records = []
+        for partition in self.partitions():
+            if partition < day:
+                continue
+            start = offset if partition == day else 0
+            partition_records, end = self._read_from(partition, start)
+            records.extend(partition_records)
+            day, offset = partition, end
+        return records, make_cursor(day, offset)
+
+    def latest_cursor(self) -> str:
+        """Cursor after everything archived so far."""
+        partitions = self.partitions()
+        if not partitions:
+            return make_cursor(self.today(), 0)
+        return self.read_since(make_cursor(partitions[-1], 0))[1]
+
+    def iter_day(self, day: str) -> Iterator[Dict]:
+        """All records of one day."""
+        yield from self._read_from(day, 0)[0]
+
+# Global instance
+headline_archive = HeadlineArchive(os.environ.get("HEADLINE_ARCHIVE_DIR", "headline_archive"))
+
+def archive_enabled() -> bool:
+    """On unless HEADLINE_ARCHIVE=0."""
+    return os.environ.get("HEADLINE_ARCHIVE", "1").lower() not in ("0", "false", "no")
+
+def group_by_source(records: List[Dict]) -> Dict[str, List[str]]:
+    """{source: [texts]} from archive records, keeping their order."""
+    grouped: Dict[str, List[str]] = {}
+    for record in records:
+        grouped.setdefault(record["source"], []).append(record["text"])
+    return grouped
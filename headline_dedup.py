@@ -0,0 +1,216 @@
+"""Collapse duplicate and near-duplicate headlines across news sources.
+
+Exact duplicates are caught on a canonical form (case, punctuation and
+spacing removed). Rewordings of the same story are caught with MinHash
+signatures of each headline's word set, bucketed into LSH bands so a
+headline is only compared with likely matches; candidates are confirmed
+by the exact Jaccard similarity of the word sets.
+
+Word overlap alone merges different stories that share a template ("TCS
+shares rise 3%" / "Infosys shares rise 3%", "Sensex rises" / "Sensex
+falls"), so a match must also agree on the companies named, the numbers
+and the direction of the move.
+"""
+import hashlib
+import random
+import re
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from text_matcher import SYMBOL_ALIASES, get_symbol_matcher
+from utils import get_logger
+
+logger = get_logger("headline_dedup")
+
+_NON_WORD = re.compile(r"[^\w]+")
+_WORD = re.compile(r"\w+")
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 64) - 1
+
+# Words that say which way a price or index moved
+UP_WORDS = frozenset("""
+    up rise rises rising rose risen gain gains gained gaining jump jumps jumped surge surges surged
+    rally rallies rallied climb climbs climbed soar soars soared advance advances advanced higher
+    rebound rebounds rebounded
+""".split())
+DOWN_WORDS = frozenset("""
+    down fall falls falling fell fallen drop drops dropped decline declines declined slump slumps
+    slumped plunge plunges plunged slide slides slid tumble tumbles tumbled crash crashes crashed
+    sink sinks sank dip dips dipped lower slip slips slipped
+""".split())
+
+def canonical_text(text: str) -> str:
+    """Lowercased words of text separated by single spaces."""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+def _token_hash(token: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+class HeadlineFacts(NamedTuple):
+    """What two wordings of one story must agree on."""
+    entities: FrozenSet[str]  # capitalized / all-caps words, lowercased
+    symbols: FrozenSet[str]  # known companies named (text_matcher labels)
+    numbers: FrozenSet[str]  # words containing a digit ("3", "q2", "200")
+    direction: FrozenSet[int]  # +1 for up words, -1 for down words
+
+def headline_facts(text: str, tokens: FrozenSet[str]) -> HeadlineFacts:
+    """Facts of a headline, given its canonical word set."""
+    words = _WORD.findall(text)
+    alpha = [w for w in words if w[0].isalpha()]
+    capitalized = [w for w in alpha if w[0].isupper()]
+    all_caps = [w for w in alpha if len(w) > 1 and w.isupper()]
+    if len(all_caps) > 0.6 * len(alpha):
+        entities = []  # a shouted headline: case says nothing
+    elif len(capitalized) > 0.6 * len(alpha):
+        entities = all_caps  # Title Case: only acronyms and tickers stand out
+    else:
+        entities = capitalized
+    direction = set()
+    if tokens & UP_WORDS:
+        direction.add(1)
+    if tokens & DOWN_WORDS:
+        direction.add(-1)
+    matches = list(get_symbol_matcher(tuple(SYMBOL_ALIASES)).finditer(text))
+    # Words of a recognized company name are compared as that company ("RIL" = "Reliance Industries")
+    alias_words = {word for m in matches for word in _WORD.findall(m.pattern)}
+    return HeadlineFacts(
+        entities=frozenset(w.lower() for w in entities) - alias_words,
+        symbols=frozenset(m.label for m in matches),
+        numbers=frozenset(t for t in tokens if any(c.isdigit() for c in t)),
+        direction=frozenset(direction),
+    )
+
+def _both_unique(a: FrozenSet[str], b: FrozenSet[str], a_all: FrozenSet[str], b_all: FrozenSet[str]) -> bool:
+    # Each side names something the other doesn't mention at all
+    return bool(a - b_all) and bool(b - a_all)
+
+def same_story(a_tokens: FrozenSet[str], a: HeadlineFacts,
+               b_tokens: FrozenSet[str], b: HeadlineFacts) -> bool:
+    """False when two similar headlines name different companies or numbers, or move opposite ways."""
+    if _both_unique(a.symbols, b.symbols, a.symbols, b.symbols):
+        return False
+    if _both_unique(a.entities, b.entities, a_tokens, b_tokens):
+        return False
+    if _both_unique(a.numbers, b.numbers, a.numbers, b.numbers):
+        return False
+    return not (len(a.direction) == len(b.direction) == 1 and a.direction != b.direction)
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+class MinHasher:
+    """num_perm MinHash values per token set, from fixed-seed universal hash permutations."""
+
+    def __init__(self, num_perm: int = 32, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                        for _ in range(num_perm)]
+
+    def signature(self, tokens: Iterable[str]) -> Tuple[int, ...]:
+        hashes = [_token_hash(t) for t in tokens]
+        if not hashes:
+            return (_MAX_HASH,) * self.num_perm
+        return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._params)
+
+class HeadlineCluster:
+    """One story: the first headline seen for it, its variants and the sources that carried it."""
+
+    def __init__(self, text: str, source: str, tokens: FrozenSet[str], facts: HeadlineFacts):
+        self.text = text
+        self.tokens = tokens
+        self.facts = facts
+        self.sources: List[str] = [source]
+        self.variants: List[str] = [text]
+        self.count = 1
+
+    def add(self, text: str, source: str) -> None:
+        self.count += 1
+        if source not in self.sources:
+            self.sources.append(source)
+        if text not in self.variants:
+            self.variants.append(text)
+
+    def to_dict(self) -> Dict:
+        return {'text': self.text, 'sources': list(self.sources), 'count': self.count}
+
+class HeadlineDeduplicator:
+    """Assigns headlines to clusters in the order they're added.
+
+    A headline joins the most similar existing story whose word-set Jaccard
+    similarity is at least `threshold` and that tells the same story (see
+    same_story). The band layout (bands x rows =
+    num_perm) makes pairs above ~0.5 similarity near-certain to be compared.
+    """
+
+    def __init__(self, threshold: float = 0.6, num_perm: int = 32, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+        self.threshold = threshold
+        self.bands = bands
+        self._rows = num_perm // bands
+        self._hasher = MinHasher(num_perm)
+        self.clusters: List[HeadlineCluster] = []
+        self._exact: Dict[str, HeadlineCluster] = {}
+        self._band_index: Dict[Tuple, List[int]] = {}  # (band, hash values) -> cluster indexes
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple]:
+        rows = self._rows
+        return [(band, signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def _nearest(self, tokens: FrozenSet[str], facts: HeadlineFacts,
+                 band_keys: List[Tuple]) -> Optional[HeadlineCluster]:
+        best, best_similarity = None, self.threshold
+        seen = set()
+        for key in band_keys:
+            for index in self._band_index.get(key, []):
+                if index in seen:
+                    continue
+                seen.add(index)
+                cluster = self.clusters[index]
+                similarity = jaccard(tokens, cluster.tokens)
+                if similarity >= best_similarity and same_story(tokens, facts, cluster.tokens, cluster.facts):
+                    best, best_similarity = cluster, similarity
+        return best
+
+    def add(self, text: str, source: str = "unknown") -> Optional[HeadlineCluster]:
+        """Add a headline; returns its cluster (None for blank text)."""
+        canonical = canonical_text(text)
+        if not canonical:
+            return None
+        cluster = self._exact.get(canonical)
+        if cluster is None:
+            tokens = frozenset(canonical.split())
+            facts = headline_facts(text, tokens)
+            band_keys = self._band_keys(self._hasher.signature(tokens))
+            cluster = self._nearest(tokens, facts, band_keys)
+            if cluster is None:
+                cluster = HeadlineCluster(text, source, tokens, facts)
+                self.clusters.append(cluster)
+                for key in band_keys:
+                    self._band_index.setdefault(key, []).append(len(self.clusters) - 1)
+                self._exact[canonical] = cluster
+                return cluster
+            self._exact[canonical] = cluster
+        cluster.add(text, source)
+        return cluster
+
+    def add_many(self, headlines: Iterable[str], source: str = "unknown") -> None:
+        for text in headlines:
+            self.add(text, source)
+
+def dedupe_headlines(news: Dict[str, List[str]], threshold: float = 0.6) -> List[HeadlineCluster]:
+    """Cluster {source: [headlines]} into distinct stories, in first-seen order."""
+    dedup = HeadlineDeduplicator(threshold=threshold)
+    total = 0
+    for source, headlines in news.items():
+        dedup.add_many(headlines, source)
+        total += len(headlines)
+    logger.debug(f"Deduplicated {total} headlines into {len(dedup.clusters)} stories")
+    return dedup.clusters
+
+def unique_headlines(news: Dict[str, List[str]], threshold: float = 0.6) -> List[str]:
+    """One representative headline per story."""
+    return [cluster.text for cluster in dedupe_headlines(news, threshold)]
@@ -0,0 +1,86 @@
+"""Per-source headline extraction on the raw lxml tree with precompiled XPath."""
+from typing import Dict, List, Optional
+
+import lxml.html
+from lxml import etree
+
+from utils import get_logger
+
+logger = get_logger("headline_extraction")
+
+def has_class(name: str) -> str:
+    """XPath predicate for CSS `.name` (whole class token, not substring)."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def _element_text(element) -> str:
+    # Whitespace-normalized text, including nested tags
+    return " ".join(element.text_content().split())
+
+def parse_html(html: str):
+    """Document tree for a page, without building a BeautifulSoup object."""
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # str input with an XML encoding declaration must be parsed as bytes
+        return lxml.html.document_fromstring(html.encode("utf-8"))
+
+class ExtractionSpec:
+    """Where a source's headlines are and which texts count as headlines.
+
+    Each XPath group is compiled once; a group's matches come in document
+    order, groups in the order given. per_group_limit caps the elements
+    taken from each group, limit the headlines returned.
+    """
+
+    def __init__(self, name: str, groups: List[str], min_length: int = 21,
+                 max_length: Optional[int] = None, per_group_limit: Optional[int] = None,
+                 limit: Optional[int] = None):
+        self.name = name
+        self.groups = [etree.XPath(group) for group in groups]
+        self.min_length = min_length
+        self.max_length = max_length
+        self.per_group_limit = per_group_limit
+        self.limit = limit
+
+    def extract_from_tree(self, root) -> List[str]:
+        headlines = []
+        for xpath in self.groups:
+            elements = xpath(root)
+            if self.per_group_limit is not None:
+                elements = elements[:self.per_group_limit]
+            for element in elements:
+                text = _element_text(element)
+                if len(text) >= self.min_length and (self.max_length is None or len(text) <= self.max_length):
+                    headlines.append(text)
+        return headlines[:self.limit] if self.limit is not None else headlines
+
+    def extract(self, html: str) -> List[str]:
+        return self.extract_from_tree(parse_html(html))
+
+# Same elements as the CSS selectors these replace, e.g. "h2, h3, a" -> "//h2 | //h3 | //a"
+HEADLINE_SPECS: Dict[str, ExtractionSpec] = {
+    "default": ExtractionSpec("default", ["//h2 | //h3 | //a"]),
+    "moneycontrol": ExtractionSpec(
+        "moneycontrol", [f"//*[{has_class('srchResult')}] | //*[{has_class('clearfix')}]//h2 | //h3//a"]
+    ),
+    "economictimes": ExtractionSpec("economictimes", [f"//*[{has_class('title')}] | //a | //h2 | //h3"]),
+    "business_standard": ExtractionSpec("business_standard", ["//h2 | //h3 | //a"]),
+    # DynamicReasonGenerator: up to 20 elements per selector, 16-199 chars, 50 in all
+    "trends": ExtractionSpec(
+        "trends",
+        [
+            "//h1", "//h2", "//h3",
+            f"//*[{has_class('title')}]", f"//*[{has_class('headline')}]", f"//*[{has_class('news-title')}]",
+            "//a[contains(@title, 'news')]", "//a[contains(@title, 'market')]",
+            "//*[contains(@class, 'headline')]", "//*[contains(@class, 'title')]",
+        ],
+        min_length=16, max_length=199, per_group_limit=20, limit=50
+    ),
+}
+
+def get_spec(name: str) -> ExtractionSpec:
+    """Spec for a source name, or the default spec."""
+    return HEADLINE_SPECS.get(name, HEADLINE_SPECS["default"])
+
+def extract_headlines(html: str, source: str = "default") -> List[str]:
+    return get_spec(source).extract(html)
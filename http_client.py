@@ -0,0 +1,202 @@
+"""Shared HTTP client for scraping: pooled keep-alive connections, concurrent fetches
+and a conditional-GET response cache."""
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cache_backends import SQLiteCacheBackend
+from utils import get_logger
+
+logger = get_logger("http_client")
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+# (connect, read) seconds for a single request
+DEFAULT_TIMEOUT = (3.05, 8)
+# Overall budget for a fetch_many() round
+DEFAULT_DEADLINE = float(os.environ.get("HTTP_FETCH_DEADLINE", 12))
+
+Timeout = Union[float, Tuple[float, float]]
+
+class FetchResult(NamedTuple):
+    url: str
+    status: Optional[int]
+    text: Optional[str]
+    error: Optional[str]
+    elapsed: float
+    body_hash: Optional[str] = None
+    not_modified: bool = False  # 304, or the same body as the cached response
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.text is not None
+
+class ResponseCache:
+    """Last body and ETag/Last-Modified validators per url, in a SQLite file."""
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600):
+        self.ttl = ttl
+        self.store = SQLiteCacheBackend(path, trusted=False)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            entry = self.store.get(url)
+        except Exception as e:
+            logger.error(f"HTTP cache read failed for {url}: {e}")
+            return None
+        return entry['data'] if entry else None
+
+    def put(self, url: str, record: Dict[str, Any]) -> None:
+        self.store.set(url, record, ttl=self.ttl, namespace="http")
+
+    def clear(self) -> None:
+        self.store.clear()
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The shared response cache, opened on first use; None if disabled with HTTP_CACHE=0."""
+    global _response_cache
+    if os.environ.get("HTTP_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                path = os.environ.get("HTTP_CACHE_PATH", "http_cache/responses.db")
+                try:
+                    _response_cache = ResponseCache(path)
+                except Exception as e:
+                    logger.error(f"HTTP response cache unavailable at {path}: {e}")
+                    return None
+    return _response_cache
+
+class HttpClient:
+    """One requests.Session shared by all scrapers, plus a worker pool for fetch_many().
+
+    Connections to each host are kept alive and reused across calls; a
+    failed connect or 502/503/504 is retried once with a short backoff.
+    Conditional fetches revalidate against the response cache, and
+    parse_once() skips reparsing a body that hasn't changed.
+    """
+
+    def __init__(self, pool_size: int = 8, timeout: Timeout = DEFAULT_TIMEOUT,
+                 retries: int = 1, headers: Optional[Dict[str, str]] = None,
+                 response_cache: Optional[ResponseCache] = None):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        retry = Retry(total=retries, read=0, backoff_factor=0.3,
+                      status_forcelist=(502, 503, 504), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="http")
+        self._response_cache = response_cache
+        self._parsed: Dict[Tuple[str, str], Tuple[str, Any]] = {}  # (url, parser) -> (body hash, value)
+        self._parsed_lock = threading.Lock()
+
+    @property
+    def response_cache(self) -> Optional[ResponseCache]:
+        return self._response_cache if self._response_cache is not None else get_response_cache()
+
+    def get(self, url: str, timeout: Optional[Timeout] = None, **kwargs) -> requests.Response:
+        return self.session.get(url, timeout=timeout or self.timeout, **kwargs)
+
+    def fetch(self, url: str, timeout: Optional[Timeout] = None, conditional: bool = True,
+              **kwargs) -> FetchResult:
+        """GET url, reporting failures in the result instead of raising.
+
+        With conditional, the request carries the cached validators; a 304
+        is answered from the cached body.
+        """
+        started = time.monotonic()
+        cache = self.response_cache if conditional else None
+        try:
+            cached = cache.get(url) if cache is not None else None
+            headers = dict(kwargs.pop("headers", None) or {})
+            if cached:
+                if cached.get("etag"):
+                    headers["If-None-Match"] = cached["etag"]
+                if cached.get("last_modified"):
+                    headers["If-Modified-Since"] = cached["last_modified"]
+            resp = self.get(url, timeout=timeout, headers=headers or None, **kwargs)
+            elapsed = time.monotonic() - started
+
+            if resp.status_code == 304 and cached:
+                return FetchResult(url, 304, cached["body"], None, elapsed, cached["hash"], True)
+            if not resp.ok or resp.status_code == 304:
+                return FetchResult(url, resp.status_code, None, f"HTTP {resp.status_code}", elapsed)
+
+            body_hash = hashlib.sha1(resp.content).hexdigest()
+            record = {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "hash": body_hash,
+                "body": resp.text,
+            }
+            unchanged = bool(cached) and cached.get("hash") == body_hash
+            if cache is not None and not (unchanged and cached.get("etag") == record["etag"]
+                                          and cached.get("last_modified") == record["last_modified"]):
+                cache.put(url, record)
+            return FetchResult(url, resp.status_code, record["body"], None, elapsed, body_hash, unchanged)
+        except Exception as e:
+            return FetchResult(url, None, None, str(e), time.monotonic() - started)
+
+    def parse_once(self, result: FetchResult, parser: str, parse: Callable[[str], Any]) -> Any:
+        """parse(result.text), reusing the last value for (url, parser) while the body is unchanged."""
+        key = (result.url, parser)
+        with self._parsed_lock:
+            hit = self._parsed.get(key)
+        if hit is not None and result.body_hash is not None and hit[0] == result.body_hash:
+            logger.debug(f"{result.url} unchanged; reusing parsed {parser}")
+            return hit[1]
+        value = parse(result.text)
+        if result.body_hash is not None:
+            with self._parsed_lock:
+                self._parsed[key] = (result.body_hash, value)
+        return value
+
+    def fetch_many(self, urls: Iterable[str], deadline: Optional[float] = None,
+                   timeout: Optional[Timeout] = None, **kwargs) -> Dict[str, FetchResult]:
+        """Fetch urls concurrently, returning whatever finished within `deadline` seconds.
+
+        Results are keyed by url in input order; a url still in flight at the
+        deadline gets a result with error "deadline exceeded".
+        """
+        deadline = DEFAULT_DEADLINE if deadline is None else deadline
+        urls = list(dict.fromkeys(urls))
+        started = time.monotonic()
+        futures = {url: self._executor.submit(self.fetch, url, timeout, **kwargs) for url in urls}
+        wait(futures.values(), timeout=deadline)
+
+        results = {}
+        for url, future in futures.items():
+            if future.done():
+                results[url] = future.result()
+            else:
+                results[url] = FetchResult(url, None, None, "deadline exceeded",
+                                           time.monotonic() - started)
+        failed = [url for url, r in results.items() if not r.ok]
+        if failed:
+            logger.warning(f"{len(failed)}/{len(urls)} fetches failed: "
+                           + ", ".join(f"{url} ({results[url].error})" for url in failed))
+        return results
+
+# Global instance
+http_client = HttpClient(pool_size=int(os.environ.get("HTTP_POOL_SIZE", 8)))
+
+def fetch(url: str, timeout: Optional[Timeout] = None, **kwargs) -> FetchResult:
+    return http_client.fetch(url, timeout=timeout, **kwargs)
+
+def parse_once(result: FetchResult, parser: str, parse: Callable[[str], Any]) -> Any:
+    return http_client.parse_once(result, parser, parse)
+
+def fetch_many(urls: Iterable[str], deadline: Optional[float] = None, **kwargs) -> Dict[str, FetchResult]:
+    return http_client.fetch_many(urls, deadline=deadline, **kwargs)
@@ -2,11 +2,13 @@
 import numpy as np
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
-from realtime_data import get_index_data, get_stock_data, data_fetcher
+from realtime_data import get_index_data, get_stock_data, data_fetcher, INDEX_SYMBOLS
 from utils import get_logger
 
 logger = get_logger("intraday_predictor")
 
+INDEX_NAMES = list(INDEX_SYMBOLS.values())
+
 class IntradayPredictor:
     def __init__(self):
         self.weights = {
@@ -17,10 +19,27 @@ class IntradayPredictor:
             'volatility': 0.1
         }
     
-    def predict_index_signal(self, index_name: str) -> Dict:
+    def predict_index_signals(self, index_data: Optional[Dict[str, Dict]] = None,
+                              index_names: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Generate signals for several indices from one shared snapshot.
+
+        Pass an already-fetched get_index_data() result to skip the fetch.
+        """
+        if index_data is None:
+            try:
+                index_data = get_index_data()
+            except Exception as e:
+                logger.error(f"Error fetching index data: {e}")
+                index_data = {}
+        
+        index_names = index_names or list(INDEX_NAMES)
+        return {name: self.predict_index_signal(name, index_data) for name in index_names}
+    
+    def predict_index_signal(self, index_name: str, index_data: Optional[Dict[str, Dict]] = None) -> Dict:
         """Generate CALL/PUT/NEUTRAL signal for indices."""
         try:
-            index_data = get_index_data()
+            if index_data is None:
+                index_data = get_index_data()
             if index_name not in index_data:
                 return self._get_fallback_signal(index_name, "Index data not available")
             
@@ -345,15 +364,13 @@ class IntradayPredictor:
 # Global predictor instance
 predictor = IntradayPredictor()
 
-def get_index_predictions() -> Dict[str, Dict]:
-    """Get predictions for all major indices."""
-    indices = ["Nifty 50", "Bank Nifty", "Sensex"]
-    predictions = {}
-    
-    for index in indices:
-        predictions[index] = predictor.predict_index_signal(index)
+def get_index_predictions(index_data: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+    """Get predictions for all major indices.
     
-    return predictions
+    The index snapshot is fetched once per call; pass index_data to reuse
+    a snapshot the caller already holds.
+    """
+    return predictor.predict_index_signals(index_data)
 
 def get_stock_picks(max_picks: int = 5) -> List[Dict]:
     """Get top intraday stock picks."""
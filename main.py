@@ -1,5 +1,7 @@
 from data_fetcher import fetch_market_news, fetch_multiple_prices
+from headline_dedup import dedupe_headlines
 from sentiment_analysis import analyze_headlines
+from text_matcher import get_symbol_matcher
 from predictor import build_training_set, train_model, predict_for_symbols, load_model
 from utils import get_logger
 import json
@@ -8,19 +10,17 @@ logger = get_logger("main")
 
 def run_pipeline(watchlist, model_path: str = "models/model.joblib"):
     news = fetch_market_news()
-    combined = []
-    for src, hs in news.items():
-        combined += hs
+    # Score each story once, however many sources carried it
+    clusters = dedupe_headlines(news)
+    combined = [c.text for c in clusters]
     sentiments = analyze_headlines(combined)
     symbols = watchlist
-    prices = fetch_multiple_prices(symbols, period="1y")
+    prices, failed_symbols = fetch_multiple_prices(symbols, period="1y", return_failed=True)
     sent_map = {s: 0.0 for s in symbols}
+    matcher = get_symbol_matcher(symbols)
     for rec in sentiments:
-        t = rec["text"].lower()
-        for s in symbols:
-            base = s.split(".")[0].lower()
-            if base in t:
-                sent_map[s] += rec.get("compound", 0.0)
+        for s in matcher.labels(rec["text"]):
+            sent_map[s] += rec.get("compound", 0.0)
     train_df = build_training_set(prices, sent_map)
     model = None
     if train_df is None or train_df.empty:
@@ -29,7 +29,9 @@ def run_pipeline(watchlist, model_path: str = "models/model.joblib"):
         model = train_model(train_df, persist_path=model_path)
     preds = predict_for_symbols(model, train_df) if model else {}
     ranked = sorted(preds.items(), key=lambda x: x[1], reverse=True)
-    out = {"news_count": sum(len(v) for v in news.values()), "preds": preds, "ranked": ranked, "sentiment_map": sent_map}
+    out = {"news_count": sum(len(v) for v in news.values()), "unique_news_count": len(clusters),
+           "news_clusters": [c.to_dict() for c in clusters], "preds": preds, "ranked": ranked, "sentiment_map": sent_map,
+           "failed_symbols": failed_symbols}
     with open("pipeline_output.json", "w", encoding="utf-8") as f:
         json.dump(out, f, indent=2)
     return out
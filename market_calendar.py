@@ -0,0 +1,144 @@
+"""NSE trading calendar: session times, holidays and market-hours-aware cache TTLs."""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+from utils import get_logger
+
+logger = get_logger("market_calendar")
+
+# India has no daylight saving, so a fixed offset avoids needing tzdata
+IST = timezone(timedelta(hours=5, minutes=30), "IST")
+
+SESSION_OPEN = time(9, 15)
+SESSION_CLOSE = time(15, 30)
+
+# NSE equity segment trading holidays (weekday closures only), from the
+# exchange's yearly holiday circulars. Extend this table each December.
+NSE_HOLIDAYS: Dict[date, str] = {
+    # 2025
+    date(2025, 2, 26): "Mahashivratri",
+    date(2025, 3, 14): "Holi",
+    date(2025, 3, 31): "Id-Ul-Fitr (Ramadan Eid)",
+    date(2025, 4, 10): "Shri Mahavir Jayanti",
+    date(2025, 4, 14): "Dr. Baba Saheb Ambedkar Jayanti",
+    date(2025, 4, 18): "Good Friday",
+    date(2025, 5, 1): "Maharashtra Day",
+    date(2025, 8, 15): "Independence Day",
+    date(2025, 8, 27): "Ganesh Chaturthi",
+    date(2025, 10, 2): "Mahatma Gandhi Jayanti / Dussehra",
+    date(2025, 10, 21): "Diwali Laxmi Pujan",
+    date(2025, 10, 22): "Diwali Balipratipada",
+    date(2025, 11, 5): "Prakash Gurpurb Sri Guru Nanak Dev",
+    date(2025, 12, 25): "Christmas",
+    # 2026
+    date(2026, 1, 15): "Municipal Corporation Elections (Maharashtra)",
+    date(2026, 1, 26): "Republic Day",
+    date(2026, 3, 3): "Holi",
+    date(2026, 3, 26): "Shri Ram Navami",
+    date(2026, 3, 31): "Shri Mahavir Jayanti",
+    date(2026, 4, 3): "Good Friday",
+    date(2026, 4, 14): "Dr. Baba Saheb Ambedkar Jayanti",
+    date(2026, 5, 1): "Maharashtra Day",
+    date(2026, 5, 28): "Bakri Id",
+    date(2026, 6, 26): "Muharram",
+    date(2026, 9, 14): "Ganesh Chaturthi",
+    date(2026, 10, 2): "Mahatma Gandhi Jayanti",
+    date(2026, 10, 20): "Dussehra",
+    date(2026, 11, 10): "Diwali Balipratipada",
+    date(2026, 11, 24): "Prakash Gurpurb Sri Guru Nanak Dev",
+    date(2026, 12, 25): "Christmas",
+}
+
+class MarketCalendar:
+    """Trading days and session times for the NSE cash market."""
+
+    def __init__(self, holidays: Optional[Dict[date, str]] = None,
+                 session_open: time = SESSION_OPEN, session_close: time = SESSION_CLOSE):
+        self.holidays = dict(NSE_HOLIDAYS if holidays is None else holidays)
+        self.session_open = session_open
+        self.session_close = session_close
+        self._known_years = {d.year for d in self.holidays}
+        self._warned_years = set()
+
+    @staticmethod
+    def now() -> datetime:
+        return datetime.now(IST)
+
+    @staticmethod
+    def _to_ist(at: Optional[datetime]) -> datetime:
+        if at is None:
+            return datetime.now(IST)
+        if at.tzinfo is None:
+            at = at.astimezone()  # naive times are local wall-clock times
+        return at.astimezone(IST)
+
+    def is_trading_day(self, day: date) -> bool:
+        if day.weekday() >= 5:
+            return False
+        if day.year not in self._known_years and day.year not in self._warned_years:
+            self._warned_years.add(day.year)
+            logger.warning(f"No NSE holiday table for {day.year}; treating only weekends as closed")
+        return day not in self.holidays
+
+    def session_bounds(self, day: date) -> Tuple[datetime, datetime]:
+        """Open and close datetimes (IST) of the session on day."""
+        return (datetime.combine(day, self.session_open, IST),
+                datetime.combine(day, self.session_close, IST))
+
+    def is_open(self, at: Optional[datetime] = None) -> bool:
+        at = self._to_ist(at)
+        if not self.is_trading_day(at.date()):
+            return False
+        session_open, session_close = self.session_bounds(at.date())
+        return session_open <= at < session_close
+
+    def next_open(self, at: Optional[datetime] = None) -> datetime:
+        """Start of the next session after `at` (the current one if it hasn't opened yet)."""
+        at = self._to_ist(at)
+        day = at.date()
+        if self.is_trading_day(day) and at < self.session_bounds(day)[0]:
+            return self.session_bounds(day)[0]
+        day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return self.session_bounds(day)[0]
+
+    def last_close(self, at: Optional[datetime] = None) -> datetime:
+        """End of the most recent session that closed at or before `at`."""
+        at = self._to_ist(at)
+        day = at.date()
+        if self.is_trading_day(day) and at >= self.session_bounds(day)[1]:
+            return self.session_bounds(day)[1]
+        day -= timedelta(days=1)
+        while not self.is_trading_day(day):
+            day -= timedelta(days=1)
+        return self.session_bounds(day)[1]
+
+    def ttl(self, open_ttl: float, at: Optional[datetime] = None,
+            post_close_grace: float = 900) -> float:
+        """Cache TTL for live data fetched at `at`.
+
+        During the session (and for post_close_grace seconds after the close,
+        while final prints settle) this is open_ttl. Otherwise nothing can
+        change before the next open, so the entry lives until then.
+        """
+        at = self._to_ist(at)
+        if self.is_open(at):
+            return open_ttl
+        if (at - self.last_close(at)).total_seconds() < post_close_grace:
+            return open_ttl
+        return (self.next_open(at) - at).total_seconds()
+
+# Global instance
+market_calendar = MarketCalendar()
+
+def is_market_open(at: Optional[datetime] = None) -> bool:
+    return market_calendar.is_open(at)
+
+def next_session_open(at: Optional[datetime] = None) -> datetime:
+    return market_calendar.next_open(at)
+
+def market_hours_ttl(open_ttl: float, post_close_grace: float = 900) -> Callable[[], float]:
+    """TTL policy: open_ttl while the market is open, else until the next session opens."""
+    def ttl() -> float:
+        return market_calendar.ttl(open_ttl, post_close_grace=post_close_grace)
+    return ttl
@@ -0,0 +1,176 @@
+"""Bounded in-memory cache tier with per-entry TTL and LRU eviction."""
+import heapq
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from utils import get_logger
+
+logger = get_logger("memory_cache")
+
+def approximate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """Rough deep size of a cached value in bytes."""
+    _seen = _seen if _seen is not None else set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    # pandas/numpy objects know their own footprint
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        try:
+            usage = memory_usage(deep=True)
+            return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+        except Exception:
+            pass
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approximate_size(k, _seen) + approximate_size(v, _seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(v, _seen) for v in value)
+    return size
+
+class _Entry:
+    __slots__ = ("value", "timestamp", "expires_at", "size")
+
+    def __init__(self, value: Any, timestamp: datetime, expires_at: float, size: int):
+        self.value = value
+        self.timestamp = timestamp
+        self.expires_at = expires_at
+        self.size = size
+
+class MemoryCache:
+    """Thread-safe LRU cache bounded by entry count and approximate bytes.
+
+    Every entry carries its own TTL. Expiry times are kept in a min-heap, so
+    sweeping expired entries only touches entries that have actually expired.
+    """
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 64 * 1024 * 1024,
+                 default_ttl: int = 30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> _Entry, least recently used first
+        self._expiry_heap = []  # (expires_at, key); stale items are skipped lazily
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get_entry(key) is not None
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, datetime]]:
+        """Return (value, stored_at) for a live entry, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value, entry.timestamp
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None,
+            timestamp: Optional[datetime] = None) -> None:
+        """Store a value that expires `ttl` seconds from now."""
+        ttl = self.default_ttl if ttl is None else ttl
+        size = approximate_size(value)
+        if size > self.max_bytes:
+            logger.debug(f"Not caching {key} in memory: {size} bytes exceeds limit")
+            return
+
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = _Entry(value, timestamp or datetime.now(), expires_at, size)
+            self._bytes += size
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            self._purge_expired_locked()
+            self._evict_locked()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self, pattern: Optional[str] = None, prefix: Optional[str] = None) -> int:
+        """Remove all entries, or those whose key starts with `prefix` and/or contains `pattern`."""
+        with self._lock:
+            if pattern is None and prefix is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._expiry_heap = []
+                self._bytes = 0
+                return removed
+            keys = [k for k in self._entries
+                    if (prefix is None or k.startswith(prefix)) and (pattern is None or pattern in k)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def _purge_expired_locked(self) -> int:
+        now = time.monotonic()
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            # Skip heap items left behind by overwritten or deleted entries
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(key)
+                removed += 1
+
+        # Rebuild if overwritten entries have left too many stale heap items
+        if len(heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [(e.expires_at, k) for k, e in self._entries.items()]
+            heapq.heapify(self._expiry_heap)
+        return removed
+
+    def _evict_locked(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            key, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry. Returns the number removed."""
+        with self._lock:
+            return self._purge_expired_locked()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
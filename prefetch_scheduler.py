@@ -0,0 +1,258 @@
+"""Background prefetch: refresh cached data on a cadence so page loads hit warm caches.
+
+Runs as a daemon thread inside the app (see run_realtime_app.py) or on its
+own as a separate process sharing the cache directory:
+
+    python prefetch_scheduler.py [--concurrency N] [--once]
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from market_calendar import market_hours_ttl
+from utils import get_logger
+
+logger = get_logger("prefetch_scheduler")
+
+Cadence = Union[float, Callable[[], float]]
+
+class PrefetchJob:
+    """A refresh function run every `cadence` seconds (or a callable returning seconds)."""
+
+    def __init__(self, name: str, fn: Callable[[], Any], cadence: Cadence,
+                 priority: int = 5, jitter: float = 0.1):
+        self.name = name
+        self.fn = fn
+        self.cadence = cadence
+        self.priority = priority  # lower runs first when the budget is short
+        self.jitter = jitter  # up to this fraction early, so jobs don't fire in lockstep
+        self.next_run = 0.0  # monotonic time; 0 means run as soon as started
+        self.last_run: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.runs = 0
+        self.failures = 0
+        self.running = False
+
+    def interval(self) -> float:
+        cadence = self.cadence() if callable(self.cadence) else self.cadence
+        # Only ever early: a late refresh would let the cache expire first
+        return max(cadence * (1 - random.uniform(0, self.jitter)), 1.0)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'priority': self.priority,
+            'running': self.running,
+            'runs': self.runs,
+            'failures': self.failures,
+            'last_run': self.last_run,
+            'last_duration': self.last_duration,
+            'last_error': self.last_error,
+            'next_run_in': max(self.next_run - time.monotonic(), 0.0)
+        }
+
+class PrefetchScheduler:
+    """Runs due jobs by priority, at most max_concurrency at a time."""
+
+    def __init__(self, max_concurrency: int = 2, tick: float = 1.0):
+        self.max_concurrency = max_concurrency
+        self.tick = tick
+        self.jobs: Dict[str, PrefetchJob] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def add_job(self, name: str, fn: Callable[[], Any], cadence: Cadence,
+                priority: int = 5, jitter: float = 0.1) -> PrefetchJob:
+        job = PrefetchJob(name, fn, cadence, priority=priority, jitter=jitter)
+        with self._lock:
+            self.jobs[name] = job
+        return job
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                            thread_name_prefix="prefetch")
+        self._thread = threading.Thread(target=self._loop, name="prefetch-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Prefetch scheduler started with {len(self.jobs)} jobs "
+                    f"(concurrency {self.max_concurrency})")
+
+    def stop(self, wait: bool = True) -> None:
+        self._stop.set()
+        if self._thread is not None and wait:
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def _due_jobs(self) -> List[PrefetchJob]:
+        now = time.monotonic()
+        with self._lock:
+            running = sum(job.running for job in self.jobs.values())
+            budget = self.max_concurrency - running
+            if budget <= 0:
+                return []
+            due = [job for job in self.jobs.values() if not job.running and job.next_run <= now]
+            due.sort(key=lambda job: (job.priority, job.next_run))
+            due = due[:budget]
+            for job in due:
+                job.running = True
+            return due
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            for job in self._due_jobs():
+                self._executor.submit(self._run_job, job)
+            self._stop.wait(self.tick)
+
+    def _run_job(self, job: PrefetchJob) -> None:
+        started = time.monotonic()
+        try:
+            job.fn()
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            logger.error(f"Prefetch job {job.name} failed: {e}")
+        finally:
+            job.runs += 1
+            job.last_run = datetime.now()
+            job.last_duration = round(time.monotonic() - started, 3)
+            with self._lock:
+                # Next run is measured from the end of this one, so slow jobs don't pile up
+                job.next_run = time.monotonic() + job.interval()
+                job.running = False
+            logger.debug(f"Prefetch job {job.name} took {job.last_duration}s")
+
+    def run_once(self) -> None:
+        """Run every job once in priority order, in the calling thread."""
+        for job in sorted(self.jobs.values(), key=lambda j: j.priority):
+            job.running = True
+            self._run_job(job)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: job.status() for name, job in self.jobs.items()}
+
+# Seconds between refreshes; each is a little shorter than the matching cache lifetime
+DEFAULT_CADENCES: Dict[str, Cadence] = {
+    'index_snapshot': market_hours_ttl(25),  # live_price TTL is 30s in session
+    'index_predictions': 25 * 60,  # UI accepts 30 minutes
+    'market_news': 10 * 60,  # UI accepts 15 minutes
+    'news_trends': 25 * 60,  # dynamic reasons accept 30 minutes
+    'universe_quotes': market_hours_ttl(25),
+    'stable_predictions': 60 * 60,  # regenerated once per day; this keeps the UI cache fresh
+    'sentiment_warmup': 24 * 3600,  # models load once; later runs are no-ops
+}
+
+def _warm_sentiment_models():
+    from sentiment_analysis import warmup
+    warmup(transformer=os.environ.get("SENTIMENT_WARMUP_TRANSFORMER", "").lower() in ("1", "true", "yes"))
+
+def _refresh_index_snapshot():
+    from realtime_data import INDEX_SYMBOLS, snapshot_engine
+    snapshot_engine.refresh(list(INDEX_SYMBOLS))
+
+def _refresh_index_predictions():
+    from fast_cache import CACHE_KEYS, refresh
+    from intraday_predictor import get_index_predictions
+    refresh(CACHE_KEYS['index_predictions'], get_index_predictions)
+
+_news_cursor: Optional[str] = None  # headline archive position already scored
+
+def _refresh_market_news():
+    global _news_cursor
+    from data_fetcher import fetch_market_news
+    from fast_cache import CACHE_KEYS, refresh
+    from headline_archive import headline_archive
+    from sentiment_analysis import analyze_headlines
+    refresh(CACHE_KEYS['market_news'], fetch_market_news)
+    # Score just the headlines archived since the last run; later full passes hit the sentiment memo
+    records, _news_cursor = headline_archive.read_since(_news_cursor)
+    if records:
+        analyze_headlines([record['text'] for record in records])
+
+def _refresh_news_trends():
+    from dynamic_reason_generator import dynamic_reason_generator
+    from fast_cache import CACHE_KEYS, refresh
+    refresh(CACHE_KEYS['news_trends'], dynamic_reason_generator.fetch_news_trends)
+
+def _refresh_universe_quotes():
+    from enhanced_intraday_predictor import enhanced_predictor
+    from realtime_data import snapshot_engine
+    snapshot_engine.refresh(enhanced_predictor.all_stocks)
+
+def _refresh_stable_predictions():
+    from fast_cache import CACHE_KEYS, refresh
+    from stable_predictor import get_stable_predictions
+    refresh(CACHE_KEYS['stock_predictions'], get_stable_predictions)
+
+def build_default_scheduler(max_concurrency: Optional[int] = None,
+                            cadences: Optional[Dict[str, Cadence]] = None) -> PrefetchScheduler:
+    """Scheduler with the app's standard jobs; cadences override DEFAULT_CADENCES by name."""
+    if max_concurrency is None:
+        max_concurrency = int(os.environ.get("PREFETCH_CONCURRENCY", 2))
+    cadences = dict(DEFAULT_CADENCES, **(cadences or {}))
+    scheduler = PrefetchScheduler(max_concurrency=max_concurrency)
+    scheduler.add_job('sentiment_warmup', _warm_sentiment_models, cadences['sentiment_warmup'], priority=0)
+    scheduler.add_job('index_snapshot', _refresh_index_snapshot, cadences['index_snapshot'], priority=0)
+    scheduler.add_job('index_predictions', _refresh_index_predictions,
+                      cadences['index_predictions'], priority=1)
+    scheduler.add_job('market_news', _refresh_market_news, cadences['market_news'], priority=2)
+    scheduler.add_job('news_trends', _refresh_news_trends, cadences['news_trends'], priority=2)
+    scheduler.add_job('universe_quotes', _refresh_universe_quotes, cadences['universe_quotes'], priority=3)
+    scheduler.add_job('stable_predictions', _refresh_stable_predictions,
+                      cadences['stable_predictions'], priority=4)
+    return scheduler
+
+_scheduler: Optional[PrefetchScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def start_background_prefetch(max_concurrency: Optional[int] = None) -> Optional[PrefetchScheduler]:
+    """Start the process-wide scheduler once (safe to call on every Streamlit rerun).
+
+    Set PREFETCH_DISABLED=1 to skip, e.g. when a standalone scheduler process runs.
+    """
+    global _scheduler
+    if os.environ.get("PREFETCH_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = build_default_scheduler(max_concurrency)
+        _scheduler.start()
+        return _scheduler
+
+def get_scheduler() -> Optional[PrefetchScheduler]:
+    return _scheduler
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the app's caches in the background.")
+    parser.add_argument("--concurrency", type=int, default=None, help="jobs run at the same time")
+    parser.add_argument("--once", action="store_true", help="run every job once and exit")
+    args = parser.parse_args()
+
+    scheduler = build_default_scheduler(args.concurrency)
+    if args.once:
+        scheduler.run_once()
+        return
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        scheduler.stop(wait=False)
+
+if __name__ == "__main__":
+    main()
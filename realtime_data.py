@@ -3,68 +3,149 @@ import requests
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import functools
+import math
+from collections import deque
+import threading
 import time
 from utils import get_logger
-from cache_manager import cache_manager, cached_call, fallback_manager
+from cache_manager import FALLBACK_TTL, cache_manager, cached_call, fallback_manager, is_fallback
+from tiered_cache import make_key, tiered_cache
+from circuit_breaker import OPEN, YFINANCE_PROVIDER, breakers
 
 logger = get_logger("realtime_data")
 
 class RealTimeDataFetcher:
     def __init__(self):
-        self.cache = {}
-        self.cache_duration = 30  # seconds
+        self._bar_locks = {}
+        self._bar_locks_guard = threading.Lock()
         
-    def _is_cache_valid(self, key: str) -> bool:
-        """Check if cached data is still valid."""
-        if key not in self.cache:
-            return False
-        timestamp, _ = self.cache[key]
-        return (datetime.now() - timestamp).total_seconds() < self.cache_duration
+        # Cached wrappers are built once; keys are derived from the call arguments and
+        # TTLs come from each namespace's policy in tiered_cache
+        self._cached_live_price = cached_call("live_price", self._fetch_live_price)
+        self._cached_options_chain = cached_call("options_chain", self._fetch_options_chain)
+        self._cached_intraday_trend = cached_call("intraday_trend", self._fetch_intraday_trend)
+        self._cached_daily_reference = cached_call(
+            "daily_reference", self._fetch_daily_reference, use_fallback=False
+        )
     
     def _get_cached_data(self, key: str) -> Optional[any]:
         """Get data from cache if valid."""
-        if self._is_cache_valid(key):
-            _, data = self.cache[key]
-            return data
-        return None
+        return tiered_cache.get(make_key("realtime", key))
+    
+    def _cache_data(self, key: str, data: any, provisional: bool = False):
+        """Cache data for the "realtime" namespace's market-hours-aware TTL.
+
+        Provisional data (empty or derived from fallback data) is only kept
+        in memory for FALLBACK_TTL seconds, so a transient failure isn't
+        served until the next session.
+        """
+        if provisional:
+            tiered_cache.memory.set(make_key("realtime", key), data, FALLBACK_TTL)
+        else:
+            tiered_cache.set(make_key("realtime", key), data)
+    
+    def _get_bar_lock(self, symbol: str) -> threading.Lock:
+        """Per-symbol lock so concurrent callers share one bar download."""
+        with self._bar_locks_guard:
+            if symbol not in self._bar_locks:
+                self._bar_locks[symbol] = threading.Lock()
+            return self._bar_locks[symbol]
+    
+    def get_intraday_bars(self, symbol: str, refresh: bool = False) -> pd.DataFrame:
+        """Get today's 1-minute bars, downloaded at most once per cache window.
+        
+        Quote fields and the 5-minute trend are both derived from these bars.
+        refresh=True downloads them again even if the cached copy is still valid.
+        """
+        cache_key = f"bars_1m_{symbol}"
+        bars = None if refresh else self._get_cached_data(cache_key)
+        if bars is not None:
+            return bars
+        
+        with self._get_bar_lock(symbol):
+            # Another thread may have downloaded the bars while we waited
+            bars = None if refresh else self._get_cached_data(cache_key)
+            if bars is not None:
+                return bars
+            
+            # Known-bad symbols fail fast with CircuitOpenError instead of a network round trip
+            bars = breakers.call(
+                YFINANCE_PROVIDER, symbol,
+                lambda: yf.Ticker(symbol).history(period="1d", interval="1m"),
+                is_empty=lambda df: df.empty
+            )
+            self._cache_data(cache_key, bars, provisional=bars.empty)
+            return bars
+    
+    @staticmethod
+    def _resample_bars(bars: pd.DataFrame, rule: str) -> pd.DataFrame:
+        """Resample OHLCV bars to a coarser interval (e.g. '5min')."""
+        resampled = bars.resample(rule, label='left', closed='left').agg({
+            'Open': 'first',
+            'High': 'max',
+            'Low': 'min',
+            'Close': 'last',
+            'Volume': 'sum'
+        })
+        return resampled.dropna(subset=['Close'])
     
-    def _cache_data(self, key: str, data: any):
-        """Cache data with timestamp."""
-        self.cache[key] = (datetime.now(), data)
+    def get_daily_reference(self, symbol: str) -> Optional[Dict]:
+        """Get previous close and average volume from the cached daily series."""
+        session_date = datetime.now().strftime('%Y-%m-%d')
+        return self._cached_daily_reference(symbol, session_date)
+    
+    def _fetch_daily_reference(self, symbol: str, session_date: str) -> Optional[Dict]:
+        """Derive previous close and average volume from ~3 months of daily bars."""
+        daily = breakers.call(
+            YFINANCE_PROVIDER, symbol,
+            lambda: yf.Ticker(symbol).history(period="3mo", interval="1d"),
+            is_empty=lambda df: df.empty
+        )
+        if daily.empty:
+            return None
+        
+        # Drop today's (still forming) bar so the last row is the previous session
+        today = pd.Timestamp.now(tz=daily.index.tz).date()
+        previous = daily[daily.index.date < today]
+        if previous.empty:
+            return None
+        
+        return {
+            'symbol': symbol,
+            'previous_close': float(previous['Close'].iloc[-1]),
+            'average_volume': float(previous['Volume'].mean()),
+            'as_of': previous.index[-1].strftime('%Y-%m-%d'),
+            'session_date': session_date
+        }
     
     def get_live_price(self, symbol: str) -> Optional[Dict]:
         """Get live price data for a symbol."""
-        return cached_call(
-            f"live_price_{symbol}",
-            self._fetch_live_price,
-            ttl=30,
-            use_fallback=True
-        )(symbol)
+        return self._cached_live_price(symbol)
     
     def _fetch_live_price(self, symbol: str) -> Optional[Dict]:
         
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            
             # Get recent price data
-            hist = ticker.history(period="1d", interval="1m")
+            hist = self.get_intraday_bars(symbol)
             if hist.empty:
                 logger.warning(f"No intraday data for {symbol}")
                 return None
             
             current_price = hist['Close'].iloc[-1]
             volume = hist['Volume'].iloc[-1]
+            reference = self.get_daily_reference(symbol) or {}
             
             # Calculate price change
-            prev_close = info.get('regularMarketPreviousClose', current_price)
+            prev_close = reference.get('previous_close', current_price)
             price_change = current_price - prev_close
             price_change_pct = (price_change / prev_close) * 100 if prev_close > 0 else 0
             
             # Calculate volume metrics
-            avg_volume = info.get('averageVolume', volume)
+            avg_volume = reference.get('average_volume', volume)
             volume_ratio = volume / avg_volume if avg_volume > 0 else 1
             
             data = {
@@ -81,7 +162,6 @@ class RealTimeDataFetcher:
                 'open_price': hist['Open'].iloc[0] if not hist.empty else current_price
             }
             
-            self._cache_data(cache_key, data)
             return data
             
         except Exception as e:
@@ -89,14 +169,21 @@ class RealTimeDataFetcher:
             # Return fallback data
             return fallback_manager.get_fallback_price_data(symbol)
     
+    def refresh_symbol(self, symbol: str) -> Optional[Dict]:
+        """Re-download bars and recompute the cached price and trend ahead of expiry.
+        
+        Options are left to their own (longer) TTL. Returns the new price data.
+        """
+        self.get_intraday_bars(symbol, refresh=True)
+        price_data = self._cached_live_price.refresh(symbol)
+        # Same positional arguments as get_intraday_trend, so the cache key matches
+        self._cached_intraday_trend.refresh(symbol, 20)
+        self.get_options_chain(symbol)
+        return price_data
+    
     def get_options_chain(self, symbol: str) -> Optional[Dict]:
         """Get options chain data for analysis."""
-        return cached_call(
-            f"options_chain_{symbol}",
-            self._fetch_options_chain,
-            ttl=60,  # Options data changes less frequently
-            use_fallback=True
-        )(symbol)
+        return self._cached_options_chain(symbol)
     
     def _fetch_options_chain(self, symbol: str) -> Optional[Dict]:
         
@@ -104,7 +191,10 @@ class RealTimeDataFetcher:
             ticker = yf.Ticker(symbol)
             
             # Try to get options data
-            expirations = ticker.options
+            # Most NSE stocks have no listed options, so this doesn't vouch for the symbol
+            expirations = breakers.call(
+                YFINANCE_PROVIDER, symbol, lambda: ticker.options, track_symbol=False
+            )
             if not expirations:
                 logger.warning(f"No options data available for {symbol}")
                 return self._get_mock_options_data(symbol)
@@ -136,7 +226,6 @@ class RealTimeDataFetcher:
                 'timestamp': datetime.now()
             }
             
-            self._cache_data(cache_key, data)
             return data
             
         except Exception as e:
@@ -177,11 +266,13 @@ class RealTimeDataFetcher:
         
         try:
             sentiment_data = {}
+            provisional = False
             
             for symbol in symbols:
                 price_data = self.get_live_price(symbol)
                 if not price_data:
                     continue
+                provisional = provisional or is_fallback(price_data)
                 
                 # Calculate momentum indicators
                 price_momentum = price_data['price_change_pct']
@@ -197,7 +288,7 @@ class RealTimeDataFetcher:
                     'timestamp': datetime.now()
                 }
             
-            self._cache_data(cache_key, sentiment_data)
+            self._cache_data(cache_key, sentiment_data, provisional=provisional or not sentiment_data)
             return sentiment_data
             
         except Exception as e:
@@ -206,18 +297,13 @@ class RealTimeDataFetcher:
     
     def get_intraday_trend(self, symbol: str, periods: int = 20) -> Dict:
         """Calculate intraday trend direction and strength."""
-        return cached_call(
-            f"intraday_trend_{symbol}_{periods}",
-            self._fetch_intraday_trend,
-            ttl=45,
-            use_fallback=True
-        )(symbol, periods)
+        return self._cached_intraday_trend(symbol, periods)
     
     def _fetch_intraday_trend(self, symbol: str, periods: int = 20) -> Dict:
         
         try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period="1d", interval="5m")
+            # 5-minute bars are resampled from the shared 1-minute download
+            hist = self._resample_bars(self.get_intraday_bars(symbol), '5min')
             
             if len(hist) < periods:
                 logger.warning(f"Insufficient data for trend analysis of {symbol}")
@@ -255,54 +341,234 @@ class RealTimeDataFetcher:
                 'timestamp': datetime.now()
             }
             
-            self._cache_data(cache_key, data)
             return data
             
         except Exception as e:
             logger.error(f"Error calculating intraday trend for {symbol}: {e}")
             return fallback_manager.get_fallback_trend_data(symbol)
 
+class SnapshotEngine:
+    """Concurrent price/options/trend fetcher for a universe of symbols.
+
+    Snapshots share one pool of max_workers threads, so calls that hang
+    past their timeout tie up at most that many threads instead of piling
+    up across snapshots. Background refreshes run on their own, smaller
+    pool (refresh_workers) and never delay a snapshot. A max_workers
+    argument can lower, not raise, the concurrency of one call. Results
+    arriving after their call was given up on are discarded.
+    """
+
+    # Each symbol needs these three calls; the fallback is used on error or timeout
+    CALLS = {
+        'price': ('get_live_price', fallback_manager.get_fallback_price_data),
+        'options': ('get_options_chain', fallback_manager.get_fallback_options_data),
+        'trend': ('get_intraday_trend', fallback_manager.get_fallback_trend_data),
+    }
+
+    def __init__(self, fetcher: RealTimeDataFetcher, max_workers: int = 16,
+                 call_timeout: float = 15.0, refresh_workers: int = 4):
+        self.fetcher = fetcher
+        self.max_workers = max_workers
+        self.refresh_workers = refresh_workers
+        self.call_timeout = call_timeout  # seconds, measured from when a call starts
+        self.last_stats = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="snapshot")
+        self._refresh_executor = ThreadPoolExecutor(max_workers=refresh_workers,
+                                                    thread_name_prefix="snapshot-refresh")
+
+    @staticmethod
+    def _abandon(future, label: str) -> None:
+        """Give up on a call: cancel it if it hasn't started, else drop its result when it ends."""
+        if future.cancel():
+            return
+
+        def discard(f):
+            if f.cancelled():
+                return
+            error = f.exception()
+            logger.debug(f"Discarding late {'error' if error else 'result'} for {label}")
+
+        future.add_done_callback(discard)
+
+    def _run_calls(self, executor: ThreadPoolExecutor, calls: Dict[Hashable, Callable[[], Any]],
+                   max_workers: int, call_timeout: float) -> Dict[Hashable, Tuple[Any, Optional[str], float]]:
+        """Run calls on executor with at most max_workers in flight; returns {key: (result, error, seconds)}.
+
+        A call is given up on call_timeout seconds after it starts running.
+        Calls still waiting for a worker when the batch deadline passes
+        (others being stuck) are given up on without having run.
+        """
+        deadline = call_timeout * (math.ceil(len(calls) / max_workers) + 1)
+        started = {}
+
+        def timed(key, fn):
+            started[key] = time.monotonic()
+            result = fn()
+            return result, time.monotonic() - started[key]
+
+        batch_start = time.monotonic()
+        queued = deque(calls)
+        futures = {}
+        pending = set()
+        outcomes = {}
+        while queued or pending:
+            while queued and len(pending) < max_workers:
+                key = queued.popleft()
+                future = executor.submit(timed, key, calls[key])
+                futures[future] = key
+                pending.add(future)
+
+            done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = futures[future]
+                try:
+                    result, elapsed = future.result()
+                    outcomes[key] = (result, None, round(elapsed, 3))
+                except Exception as e:
+                    outcomes[key] = (None, str(e), round(time.monotonic() - started.get(key, batch_start), 3))
+
+            now = time.monotonic()
+            overdue = now - batch_start > deadline
+            no_worker = f"no worker free within {deadline:.0f}s"
+            for future in list(pending):
+                key = futures[future]
+                call_start = started.get(key)
+                if call_start is not None and now - call_start > call_timeout:
+                    outcomes[key] = (None, f"timed out after {call_timeout}s", round(now - call_start, 3))
+                elif call_start is None and overdue:
+                    outcomes[key] = (None, no_worker, round(now - batch_start, 3))
+                else:
+                    continue
+                self._abandon(future, str(key))
+                pending.discard(future)
+            if overdue:
+                for key in queued:
+                    outcomes[key] = (None, no_worker, round(now - batch_start, 3))
+                queued.clear()
+        return outcomes
+
+    def fetch(self, symbols: List[str], max_workers: Optional[int] = None,
+              call_timeout: Optional[float] = None) -> Dict[str, Dict]:
+        """Fetch price, options and trend data for all symbols concurrently.
+
+        Returns {symbol: {'symbol', 'price_data', 'options_data', 'trend_data',
+        'fetch_time', 'timings', 'errors', 'circuit'}}. Symbols without price
+        data are left out, as in the sequential version, and so are symbols
+        whose circuit breaker is open (listed in last_stats['circuit_open']).
+        """
+        max_workers = max(1, min(max_workers or self.max_workers, self.max_workers))
+        call_timeout = call_timeout or self.call_timeout
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+
+        results = {symbol: {} for symbol in symbols}
+        timings = {symbol: {} for symbol in symbols}
+        errors = {symbol: {} for symbol in symbols}
+
+        # Symbols whose breaker is open are known to be failing; skip them outright
+        circuit_open = [s for s in symbols if breakers.symbol(s).state == OPEN]
+        for symbol in circuit_open:
+            errors[symbol]['circuit'] = f"circuit open; retry in {breakers.symbol(symbol).retry_in():.0f}s"
+        live_symbols = [s for s in symbols if s not in circuit_open]
+
+        refresh_start = time.monotonic()
+        calls = {
+            (symbol, call_name): functools.partial(getattr(self.fetcher, method_name), symbol)
+            for symbol in live_symbols
+            for call_name, (method_name, _) in self.CALLS.items()
+        }
+        outcomes = self._run_calls(self._executor, calls, max_workers, call_timeout) if calls else {}
+        for (symbol, call_name), (result, error, elapsed) in outcomes.items():
+            timings[symbol][call_name] = elapsed
+            if error is None:
+                results[symbol][call_name] = result
+            else:
+                errors[symbol][call_name] = error
+
+        data = {}
+        for symbol in symbols:
+            for call_name, (_, fallback) in self.CALLS.items():
+                if results[symbol].get(call_name) is None and call_name in errors[symbol]:
+                    results[symbol][call_name] = fallback(symbol)
+
+            price_data = results[symbol].get('price')
+            if errors[symbol] and symbol not in circuit_open:
+                logger.warning(f"Snapshot errors for {symbol}: {errors[symbol]}")
+            if not price_data:
+                continue
+
+            data[symbol] = {
+                'symbol': symbol,
+                'price_data': price_data,
+                'options_data': results[symbol].get('options') or {},
+                'trend_data': results[symbol].get('trend'),
+                'fetch_time': max(timings[symbol].values(), default=0.0),
+                'timings': timings[symbol],
+                'errors': errors[symbol],
+                'circuit': breakers.get_state(symbol)['state']
+            }
+
+        elapsed = time.monotonic() - refresh_start
+        self.last_stats = {
+            'symbols': len(symbols),
+            'returned': len(data),
+            'elapsed': round(elapsed, 3),
+            'slowest_symbol': max(
+                symbols, key=lambda s: max(timings[s].values(), default=0.0)
+            ),
+            'errors': {s: e for s, e in errors.items() if e},
+            'circuit_open': circuit_open,
+            'timestamp': datetime.now()
+        }
+        logger.info(f"Snapshot of {len(symbols)} symbols took {elapsed:.2f}s "
+                    f"({len(self.last_stats['errors'])} with errors)")
+        return data
+
+    def refresh(self, symbols: List[str], max_workers: Optional[int] = None,
+                call_timeout: Optional[float] = None) -> Dict[str, bool]:
+        """Refresh cached data for symbols before it expires (used by the prefetch scheduler).
+        
+        Runs on the refresh pool, at most refresh_workers symbols at a time.
+        Each symbol makes one call per CALLS entry in turn, so its timeout is
+        that many call_timeouts from when it starts. Symbols with an open
+        circuit breaker are skipped. Returns {symbol: refreshed}.
+        """
+        max_workers = max(1, min(max_workers or self.refresh_workers, self.refresh_workers))
+        call_timeout = (call_timeout or self.call_timeout) * len(self.CALLS)
+        symbols = [s for s in dict.fromkeys(symbols) if breakers.symbol(s).state != OPEN]
+        if not symbols:
+            return {}
+        
+        calls = {symbol: functools.partial(self.fetcher.refresh_symbol, symbol) for symbol in symbols}
+        outcomes = self._run_calls(self._refresh_executor, calls, max_workers, call_timeout)
+        refreshed = {}
+        for symbol, (price_data, error, _) in outcomes.items():
+            if error is not None:
+                logger.warning(f"Refresh failed for {symbol}: {error}")
+            refreshed[symbol] = price_data is not None and not is_fallback(price_data)
+        
+        logger.info(f"Refreshed {sum(refreshed.values())}/{len(symbols)} symbols")
+        return refreshed
+
 # Global instance
 data_fetcher = RealTimeDataFetcher()
+snapshot_engine = SnapshotEngine(data_fetcher)
+
+INDEX_SYMBOLS = {"^NSEI": "Nifty 50", "^NSEBANK": "Bank Nifty", "^BSESN": "Sensex"}
 
 def get_index_data() -> Dict[str, Dict]:
     """Get comprehensive data for major indices."""
-    indices = ["^NSEI", "^NSEBANK", "^BSESN"]  # Nifty 50, Bank Nifty, Sensex
-    index_names = ["Nifty 50", "Bank Nifty", "Sensex"]
+    snapshot = snapshot_engine.fetch(list(INDEX_SYMBOLS))
     
     data = {}
-    
-    for symbol, name in zip(indices, index_names):
-        price_data = data_fetcher.get_live_price(symbol)
-        options_data = data_fetcher.get_options_chain(symbol)
-        trend_data = data_fetcher.get_intraday_trend(symbol)
-        
-        if price_data:
-            data[name] = {
-                'symbol': symbol,
-                'price_data': price_data,
-                'options_data': options_data or {},
-                'trend_data': trend_data,
-                'name': name
-            }
+    for symbol, name in INDEX_SYMBOLS.items():
+        if symbol in snapshot:
+            data[name] = dict(snapshot[symbol], name=name)
     
     return data
 
-def get_stock_data(symbols: List[str]) -> Dict[str, Dict]:
-    """Get comprehensive data for stock symbols."""
-    data = {}
-    
-    for symbol in symbols:
-        price_data = data_fetcher.get_live_price(symbol)
-        options_data = data_fetcher.get_options_chain(symbol)
-        trend_data = data_fetcher.get_intraday_trend(symbol)
-        
-        if price_data:
-            data[symbol] = {
-                'symbol': symbol,
-                'price_data': price_data,
-                'options_data': options_data or {},
-                'trend_data': trend_data
-            }
-    
-    return data
+def get_stock_data(symbols: List[str], max_workers: Optional[int] = None,
+                   call_timeout: Optional[float] = None) -> Dict[str, Dict]:
+    """Get comprehensive data for stock symbols, fetched concurrently."""
+    return snapshot_engine.fetch(symbols, max_workers=max_workers, call_timeout=call_timeout)
@@ -16,5 +16,9 @@ if __name__ == "__main__":
         initial_sidebar_state="expanded"
     )
     
+    # Warm caches in the background so page loads don't wait on refills
+    from prefetch_scheduler import start_background_prefetch
+    start_background_prefetch()
+    
     # Import and run the UI app
     import ui_app
@@ -1,27 +1,223 @@
-from typing import Dict
+from typing import Dict, List, Optional
+import os
+import threading
+import time
+from sentiment_memo import get_sentiment_memo, normalize_text
 from utils import get_logger
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
 
 # Initialize logger
 logger = get_logger("sentiment_analysis")
 
-# Ensure VADER lexicon is available
-try:
-    nltk.data.find("sentiment/vader_lexicon.zip")
-except Exception:
-    nltk.download("vader_lexicon")
+# Analyzers are built on first use (or by warmup()) and shared process-wide.
+# Pre-provisioned models load from local paths without network access:
+#   SENTIMENT_NLTK_DATA   NLTK data directory containing sentiment/vader_lexicon.zip
+#   SENTIMENT_MODEL_PATH  directory of a saved transformers sentiment model
+#   SENTIMENT_OFFLINE=1   never download the VADER lexicon (implied by SENTIMENT_NLTK_DATA)
+_vader = None
+_vader_failed_at = None
+_transformer_pipeline = None
+_transformer_failed = False
+_model_lock = threading.Lock()
 
-# Initialize VADER sentiment analyzer
-sia = SentimentIntensityAnalyzer()
+# Don't retry a failed VADER load (e.g. lexicon download) on every call
+VADER_RETRY_SECONDS = 300
 
-# Try to initialize transformer pipeline if available
-_transformer_pipeline = None
-try:
-    from transformers import pipeline
-    _transformer_pipeline = pipeline("sentiment-analysis")
-except Exception:
-    pass
+def _offline() -> bool:
+    return os.environ.get("SENTIMENT_OFFLINE", "").lower() in ("1", "true", "yes")
+
+def get_vader():
+    """The shared VADER analyzer, created on first call."""
+    global _vader, _vader_failed_at
+    if _vader is None:
+        with _model_lock:
+            if _vader is None:
+                if _vader_failed_at is not None and time.monotonic() - _vader_failed_at < VADER_RETRY_SECONDS:
+                    raise LookupError("VADER lexicon unavailable; retrying later")
+                try:
+                    _vader = _load_vader()
+                except Exception:
+                    _vader_failed_at = time.monotonic()
+                    raise
+                logger.info("VADER sentiment analyzer loaded")
+    return _vader
+
+def _load_vader():
+    import nltk
+    from nltk.sentiment import SentimentIntensityAnalyzer
+
+    data_dir = os.environ.get("SENTIMENT_NLTK_DATA")
+    if data_dir and data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, data_dir)
+    # Ensure VADER lexicon is available
+    try:
+        nltk.data.find("sentiment/vader_lexicon.zip")
+    except LookupError:
+        if data_dir or _offline():
+            raise
+        nltk.download("vader_lexicon", quiet=True)
+    return SentimentIntensityAnalyzer()
+
+def get_transformer_pipeline():
+    """The shared transformers sentiment pipeline, or None if it can't be built.
+
+    A failed load is remembered so it isn't retried on every call.
+    """
+    global _transformer_pipeline, _transformer_failed
+    if _transformer_pipeline is None and not _transformer_failed:
+        with _model_lock:
+            if _transformer_pipeline is None and not _transformer_failed:
+                try:
+                    from transformers import pipeline
+
+                    model_path = os.environ.get("SENTIMENT_MODEL_PATH")
+                    if model_path:
+                        _transformer_pipeline = pipeline(
+                            "sentiment-analysis", model=model_path, tokenizer=model_path,
+                            model_kwargs={"local_files_only": True}
+                        )
+                    else:
+                        _transformer_pipeline = pipeline("sentiment-analysis")
+                    logger.info("Transformer sentiment pipeline loaded")
+                except Exception as e:
+                    _transformer_failed = True
+                    logger.warning(f"Transformer sentiment pipeline unavailable: {e}")
+    return _transformer_pipeline
+
+def warmup(transformer: bool = False) -> None:
+    """Load analyzers ahead of the first request (VADER, plus the transformer if asked)."""
+    try:
+        get_vader()
+    except Exception as e:
+        logger.error(f"Could not load VADER analyzer: {e}")
+    if transformer:
+        get_transformer_pipeline()
+
+def __getattr__(name):
+    # Backward compatibility for `from sentiment_analysis import sia`
+    if name == "sia":
+        return get_vader()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Batched transformer inference settings
+DEFAULT_BATCH_SIZE = int(os.environ.get("SENTIMENT_BATCH_SIZE", 32))
+DEFAULT_MAX_TOKENS = int(os.environ.get("SENTIMENT_MAX_TOKENS", 128))  # headlines are short
+_NEUTRAL = {"neg": 0.0, "neu": 1.0, "pos": 0.0, "compound": 0.0}
+
+def _label_to_scores(result: Dict) -> Dict[str, float]:
+    """Map a pipeline {'label', 'score'} result to neg/neu/pos/compound."""
+    lab = result.get("label", "")
+    sc = float(result.get("score", 0.0))
+    if lab.upper().startswith("POS"):
+        return {"neg": 0.0, "neu": 1 - sc, "pos": sc, "compound": sc}
+    else:
+        return {"neg": sc, "neu": 1 - sc, "pos": 0.0, "compound": -sc}
+
+def _transformer_id(transformer, max_tokens: int) -> str:
+    model = getattr(transformer, "model", None)
+    name = getattr(model, "name_or_path", None) or type(transformer).__name__
+    return f"transformer:{name}:{max_tokens}"
+
+def _vader_scores(texts: List[str]) -> List[Dict[str, float]]:
+    sia = get_vader()
+    results = []
+    for text in texts:
+        try:
+            results.append(sia.polarity_scores(text))
+        except Exception:
+            results.append(dict(_NEUTRAL))
+    return results
+
+def _set_num_threads(num_threads: Optional[int]) -> None:
+    if not num_threads:
+        return
+    try:
+        import torch
+        if torch.get_num_threads() != num_threads:
+            torch.set_num_threads(num_threads)
+    except Exception:
+        pass
+
+def _transformer_scores(transformer, texts: List[str], batch_size: int,
+                        max_tokens: int) -> List[Dict[str, float]]:
+    """Score all texts in one batched pass.
+
+    Texts are sorted by token length first, so each batch pads only to the
+    length of its own longest text; results are returned in input order.
+    """
+    tokenizer = getattr(transformer, "tokenizer", None)
+    if tokenizer is not None:
+        lengths = [len(ids) for ids in tokenizer(texts, truncation=True, max_length=max_tokens)["input_ids"]]
+    else:
+        lengths = [len(t) for t in texts]
+    order = sorted(range(len(texts)), key=lambda i: lengths[i])
+
+    outputs = transformer(
+        [texts[i] for i in order], batch_size=batch_size, truncation=True, max_length=max_tokens
+    )
+    results = [None] * len(texts)
+    for i, output in zip(order, outputs):
+        results[i] = _label_to_scores(output[0] if isinstance(output, list) else output)
+    return results
+
+def _score_uncached(texts: List[str], transformer, batch_size: int, max_tokens: int,
+                    num_threads: Optional[int]):
+    """Score texts with the transformer or VADER. Returns (model_id, scores)."""
+    if transformer is not None:
+        _set_num_threads(num_threads or int(os.environ.get("SENTIMENT_NUM_THREADS", 0)))
+        try:
+            return _transformer_id(transformer, max_tokens), _transformer_scores(
+                transformer, texts, batch_size, max_tokens
+            )
+        except Exception as e:
+            logger.error(f"Batched transformer scoring failed, using VADER: {e}")
+    # Default to VADER
+    return "vader", _vader_scores(texts)
+
+def score_texts(texts: List[str], use_transformer: bool = False,
+                batch_size: Optional[int] = None, max_tokens: Optional[int] = None,
+                num_threads: Optional[int] = None, use_memo: bool = True) -> List[Dict[str, float]]:
+    """
+    Score many texts for sentiment in one pass.
+    With use_transformer=True the pipeline runs in length-bucketed batches of
+    batch_size, truncated to max_tokens, on num_threads CPU threads
+    (SENTIMENT_BATCH_SIZE / SENTIMENT_MAX_TOKENS / SENTIMENT_NUM_THREADS).
+    Falls back to VADER if the transformer is unavailable or fails.
+    With use_memo, only texts not scored before by the same model are scored
+    (see sentiment_memo).
+    Returns one neg/neu/pos/compound dict per text, in input order.
+    """
+    texts = [t if isinstance(t, str) else str(t) for t in texts]
+    if not texts:
+        return []
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    max_tokens = max_tokens or DEFAULT_MAX_TOKENS
+    transformer = get_transformer_pipeline() if use_transformer else None
+    model_id = _transformer_id(transformer, max_tokens) if transformer is not None else "vader"
+
+    memo = get_sentiment_memo() if use_memo else None
+    known = memo.get_many(texts, model_id) if memo is not None else {}
+    # Texts differing only in spacing share one score, as in the memo
+    unseen = {}
+    for t in texts:
+        if t not in known:
+            unseen.setdefault(normalize_text(t), t)
+    if unseen:
+        representatives = list(unseen.values())
+        try:
+            scored_by, scores = _score_uncached(
+                representatives, transformer, batch_size, max_tokens, num_threads
+            )
+        except Exception as e:
+            logger.error(f"Sentiment scoring failed: {e}")
+            scores = [dict(_NEUTRAL) for _ in representatives]
+        else:
+            if memo is not None:
+                memo.set_many(dict(zip(representatives, scores)), scored_by)
+        by_normalized = dict(zip(unseen, scores))
+        for t in texts:
+            if t not in known:
+                known[t] = by_normalized[normalize_text(t)]
+    return [known[t] for t in texts]
 
 def score_text(text: str, use_transformer: bool = False) -> Dict[str, float]:
     """
@@ -30,29 +226,18 @@ def score_text(text: str, use_transformer: bool = False) -> Dict[str, float]:
     Otherwise fall back to VADER sentiment analysis.
     Returns a dictionary with neg/neu/pos/compound scores.
     """
-    try:
-        if use_transformer and _transformer_pipeline is not None:
-            t = _transformer_pipeline(text[:512])
-            if isinstance(t, list) and t:
-                lab = t[0].get("label", "")
-                sc = float(t[0].get("score", 0.0))
-                if lab.upper().startswith("POS"):
-                    return {"neg": 0.0, "neu": 1 - sc, "pos": sc, "compound": sc}
-                else:
-                    return {"neg": sc, "neu": 1 - sc, "pos": 0.0, "compound": -sc}
-        # Default to VADER
-        return sia.polarity_scores(text)
-    except Exception:
-        return {"neg": 0.0, "neu": 1.0, "pos": 0.0, "compound": 0.0}
+    return score_texts([text], use_transformer=use_transformer)[0]
 
-def analyze_headlines(headlines: list, use_transformer: bool = False) -> list:
+def analyze_headlines(headlines: list, use_transformer: bool = False,
+                      batch_size: Optional[int] = None, num_threads: Optional[int] = None) -> list:
     """
     Analyze a list of headlines for sentiment.
     Returns a list of dictionaries with text and sentiment scores.
     """
     results = []
-    for headline in headlines:
-        scores = score_text(headline, use_transformer=use_transformer)
+    all_scores = score_texts(headlines, use_transformer=use_transformer,
+                             batch_size=batch_size, num_threads=num_threads)
+    for headline, scores in zip(headlines, all_scores):
         results.append({
             "text": headline,
             "neg": scores.get("neg", 0.0),
@@ -60,4 +245,4 @@ def analyze_headlines(headlines: list, use_transformer: bool = False) -> list:
             "pos": scores.get("pos", 0.0),
             "compound": scores.get("compound", 0.0)
         })
-    return results
\ No newline at end of file
+    return results
@@ -0,0 +1,104 @@
+"""Memoized headline sentiment: in-memory LRU over a persistent SQLite store."""
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Iterable, Optional
+
+from cache_backends import SQLiteCacheBackend
+from memory_cache import MemoryCache
+from utils import get_logger
+
+logger = get_logger("sentiment_memo")
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form of a headline.
+
+    Case is kept: VADER scores capitalized words ("CRASH") more strongly,
+    so case variants can score differently.
+    """
+    return _WHITESPACE.sub(" ", text).strip()
+
+class SentimentMemo:
+    """Scores keyed by normalized text plus the id of the model that produced them.
+
+    A text's score under a given model never changes, so entries only expire
+    to bound the store's size.
+    """
+
+    def __init__(self, path: str, max_memory_entries: int = 20000,
+                 ttl: float = 14 * 24 * 3600):
+        self.ttl = ttl
+        self.memory = MemoryCache(max_entries=max_memory_entries, default_ttl=ttl)
+        self.store = SQLiteCacheBackend(path, trusted=False)
+
+    @staticmethod
+    def key(text: str, model_id: str) -> str:
+        digest = hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+        # "v2": earlier keys hashed lowercased text and may hold a case variant's score
+        return f"{model_id}:v2:{digest}"
+
+    def get_many(self, texts: Iterable[str], model_id: str) -> Dict[str, Dict[str, float]]:
+        """Return {text: scores} for the texts already scored by model_id."""
+        keys = {}
+        for text in texts:
+            keys.setdefault(self.key(text, model_id), []).append(text)
+
+        found = {}
+        missing = []
+        for key, key_texts in keys.items():
+            scores = self.memory.get(key)
+            if scores is None:
+                missing.append(key)
+            else:
+                found.update((t, scores) for t in key_texts)
+
+        if missing:
+            try:
+                stored = self.store.get_many(missing)
+            except Exception as e:
+                logger.error(f"Sentiment memo read failed: {e}")
+                stored = {}
+            for key, entry in stored.items():
+                self.memory.set(key, entry['data'], self.ttl)
+                found.update((t, entry['data']) for t in keys[key])
+        return found
+
+    def set_many(self, scores: Dict[str, Dict[str, float]], model_id: str) -> None:
+        """Remember {text: scores} produced by model_id."""
+        items = {self.key(text, model_id): value for text, value in scores.items()}
+        for key, value in items.items():
+            self.memory.set(key, value, self.ttl)
+        try:
+            self.store.set_many(items, ttl=self.ttl, namespace=model_id)
+        except Exception as e:
+            logger.error(f"Sentiment memo write failed: {e}")
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.store.clear()
+
+_memo: Optional[SentimentMemo] = None
+_memo_lock = threading.Lock()
+
+def get_sentiment_memo() -> Optional[SentimentMemo]:
+    """The shared memo, opened on first use; None if disabled with SENTIMENT_MEMO=0.
+
+    Lives outside the tiered cache directory, so clearing that cache keeps
+    scores (which never go stale).
+    """
+    global _memo
+    if os.environ.get("SENTIMENT_MEMO", "1").lower() in ("0", "false", "no"):
+        return None
+    if _memo is None:
+        with _memo_lock:
+            if _memo is None:
+                path = os.environ.get("SENTIMENT_MEMO_PATH", "sentiment_cache/memo.db")
+                try:
+                    _memo = SentimentMemo(path)
+                except Exception as e:
+                    logger.error(f"Sentiment memo unavailable at {path}: {e}")
+                    return None
+    return _memo
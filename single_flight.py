@@ -0,0 +1,175 @@
+"""Request coalescing: concurrent misses for one key share a single computation."""
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from utils import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = get_logger("single_flight")
+
+# Seconds a follower waits for the leader before computing on its own
+DEFAULT_WAIT_TIMEOUT = float(os.environ.get("SINGLE_FLIGHT_WAIT_TIMEOUT", 60))
+
+def process_locks_enabled() -> bool:
+    """Cross-process coalescing is opt-in via CACHE_PROCESS_LOCKS=1."""
+    return os.environ.get("CACHE_PROCESS_LOCKS", "").lower() in ("1", "true", "yes")
+
+class LockTimeout(TimeoutError):
+    """A FileLock wasn't acquired within its timeout."""
+
+class FileLock:
+    """Exclusive advisory lock on a file, held for the duration of a with-block.
+
+    With a timeout, acquiring raises LockTimeout after that many seconds
+    instead of waiting for the holder indefinitely.
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        self.path = path
+        self.timeout = timeout
+        self._fh = None
+
+    def _try_lock(self) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._fh = open(self.path, "a+")
+        if fcntl is not None and self.timeout is None:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+            return
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not self._try_lock():
+            if deadline is not None and time.monotonic() >= deadline:
+                self._fh.close()
+                self._fh = None
+                raise LockTimeout(f"Lock {self.path} still held after {self.timeout:g}s")
+            time.sleep(0.05)
+
+    def release(self) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            else:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Run at most one computation per key at a time.
+
+    Threads that ask for a key while it is being computed wait for that
+    computation and get its result, or its exception re-raised; one that
+    waits longer than wait_timeout stops waiting and computes the value
+    itself, so a hung leader can't block every caller. With lock_dir set,
+    the leader also takes a per-key file lock so worker processes sharing
+    a cache directory coalesce as well; it waits for that lock no longer
+    than wait_timeout either.
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None,
+                 wait_timeout: float = DEFAULT_WAIT_TIMEOUT):
+        self.lock_dir = lock_dir
+        self.wait_timeout = wait_timeout
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def _lock_path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.lock_dir, f"{digest}.lock")
+
+    def do(self, key: str, fn: Callable[[], Any],
+           recheck: Optional[Callable[[], Any]] = None) -> Any:
+        """Return fn() for key, sharing one in-flight call between concurrent callers.
+
+        `recheck` is called by the leader before computing (and after taking
+        the file lock); a non-None result is used instead of calling fn, so
+        work finished just before we got here isn't repeated.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            if not call.event.wait(self.wait_timeout):
+                logger.warning(f"Waited {self.wait_timeout:g}s for in-flight {key}; "
+                               "computing it directly")
+                return self._run(fn, recheck)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            if self.lock_dir:
+                call.result = self._run_locked(key, fn, recheck)
+            else:
+                call.result = self._run(fn, recheck)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _run_locked(self, key: str, fn: Callable[[], Any],
+                    recheck: Optional[Callable[[], Any]]) -> Any:
+        """_run under the key's file lock, or without it if another process holds it too long."""
+        lock = FileLock(self._lock_path(key), timeout=self.wait_timeout)
+        try:
+            lock.acquire()
+        except LockTimeout as e:
+            logger.warning(f"{e}; computing {key} without it")
+            return self._run(fn, recheck)
+        try:
+            return self._run(fn, recheck)
+        finally:
+            lock.release()
+
+    @staticmethod
+    def _run(fn: Callable[[], Any], recheck: Optional[Callable[[], Any]]) -> Any:
+        if recheck is not None:
+            result = recheck()
+            if result is not None:
+                return result
+        return fn()
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
@@ -7,7 +7,7 @@ import json
 import os
 from utils import get_logger
 import random
-from dynamic_reason_generator import get_dynamic_reason
+from dynamic_reason_generator import get_dynamic_reasons
 
 logger = get_logger("stable_predictor")
 
@@ -202,7 +202,7 @@ class StablePredictor:
         
         # Sort by score and take top 8
         predictions.sort(key=lambda x: x['overall_score'], reverse=True)
-        return predictions[:8]
+        return self._add_reasons(predictions[:8], "Regular")
     
     def _predict_penny_stocks(self, market_analysis: Dict, news_analysis: Dict, sector_analysis: Dict) -> List[Dict]:
         """Predict penny stocks with realistic prices under ₹50."""
@@ -232,7 +232,7 @@ class StablePredictor:
         
         # Sort by score and take top 8
         predictions.sort(key=lambda x: x['overall_score'], reverse=True)
-        return predictions[:8]
+        return self._add_reasons(predictions[:8], "Penny")
     
     def _create_detailed_prediction(self, symbol: str, base_price: float, score: float, category: str) -> Dict:
         """Create detailed prediction with realistic data."""
@@ -251,16 +251,16 @@ class StablePredictor:
             sell_position = f"₹{current_price * 1.04:.2f} (Target +4%)"
             high_returns = "3% - 6%"
         
-        # Generate dynamic user-friendly reason
-        reason = get_dynamic_reason(symbol, score, category)
+        # Dynamic user-friendly reason is filled in by _add_reasons for the picks kept
         risk_factors = self._generate_risk_factors(category, score)
         
         return {
+            'symbol': symbol,
             'stock_name': symbol.replace('.NS', ''),
             'price': f"₹{current_price:.2f}",
             'buy_position': buy_position,
             'sell_position': sell_position,
-            'reason': reason,
+            'reason': None,
             'high_returns': high_returns,
             'risk_factors': risk_factors,
             'overall_score': score,
@@ -274,6 +274,13 @@ class StablePredictor:
             'market_conditions': self._get_market_context()
         }
     
+    def _add_reasons(self, predictions: List[Dict], category: str) -> List[Dict]:
+        """Fill in dynamic reasons for all predictions from one news trends snapshot."""
+        items = [(p['symbol'], p['overall_score'], category) for p in predictions]
+        for prediction, reason in zip(predictions, get_dynamic_reasons(items)):
+            prediction['reason'] = reason
+        return predictions
+    
     def _calculate_technical_analysis(self, symbol: str, price: float) -> float:
         """Calculate technical analysis score."""
         # Simulate technical indicators
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from bar_store import PARQUET_AVAILABLE, BarStore, has_corporate_actions, period_start, supports_period
+
+pytestmark = pytest.mark.skipif(not PARQUET_AVAILABLE, reason="pyarrow not installed")
+
+def _bars(index, close):
+    return pd.DataFrame({"Close": close}, index=index)
+
+def test_mixed_tz_writes_stay_readable(tmp_path):
+    store = BarStore(root=str(tmp_path))
+    # Ticker.history path: tz-aware exchange-local bars
+    aware = pd.date_range("2025-01-06", periods=3, freq="B", tz="Asia/Kolkata")
+    store.append("TCS.NS", "1d", _bars(aware, [1.0, 2.0, 3.0]))
+    # yf.download path: naive daily bars, overlapping the last one
+    naive = pd.date_range("2025-01-08", periods=3, freq="B")
+    store.append("TCS.NS", "1d", _bars(naive, [30.0, 4.0, 5.0]))
+
+    df = store.read("TCS.NS", "1d")
+    assert df is not None
+    assert df.index.tz is None
+    assert list(df.index) == list(pd.date_range("2025-01-06", periods=5, freq="B"))
+    # The newer write wins for the overlapping bar
+    assert list(df["Close"]) == [1.0, 2.0, 30.0, 4.0, 5.0]
+    assert store.last_timestamp("TCS.NS", "1d") == pd.Timestamp("2025-01-10")
+
+def test_read_bounds_accept_aware_and_naive(tmp_path):
+    store = BarStore(root=str(tmp_path))
+    aware = pd.date_range("2025-01-06", periods=5, freq="B", tz="Asia/Kolkata")
+    store.append("INFY.NS", "1d", _bars(aware, [1.0, 2.0, 3.0, 4.0, 5.0]))
+
+    assert len(store.read("INFY.NS", "1d", start="2025-01-08")) == 3
+    start = pd.Timestamp("2025-01-08", tz="Asia/Kolkata")
+    assert len(store.read("INFY.NS", "1d", start=start)) == 3
+
+def test_corporate_actions_only_count_after_last_stored_bar():
+    index = pd.date_range("2025-01-06", periods=3, freq="B", tz="Asia/Kolkata")
+    delta = pd.DataFrame({"Close": [1.0, 2.0, 3.0], "Dividends": [4.0, 0.0, 0.0],
+                          "Stock Splits": [0.0, 0.0, 0.0]}, index=index)
+    # The dividend sits on the already-stored overlap bar
+    assert not has_corporate_actions(delta, pd.Timestamp("2025-01-06"))
+    delta.iloc[2, 2] = 2.0
+    assert has_corporate_actions(delta, pd.Timestamp("2025-01-06"))
+    assert not has_corporate_actions(delta[["Close"]], pd.Timestamp("2025-01-06"))
+
+def test_replace_drops_old_parts_and_coverage(tmp_path):
+    store = BarStore(root=str(tmp_path))
+    index = pd.date_range("2025-01-06", periods=3, freq="B")
+    store.append("SBIN.NS", "1d", _bars(index, [1.0, 2.0, 3.0]))
+    store.mark_backfilled("SBIN.NS", "1d", pd.Timestamp("2025-01-01"))
+    store.replace("SBIN.NS", "1d", _bars(index, [0.5, 1.0, 1.5]))
+
+    assert list(store.read("SBIN.NS", "1d")["Close"]) == [0.5, 1.0, 1.5]
+    assert len(store._part_files("SBIN.NS", "1d")) == 1
+    assert not store.covers("SBIN.NS", "1d", pd.Timestamp("2025-01-01"))
+
+def test_unsupported_periods_are_reported_not_raised():
+    for period in ("1y", "5d", "ytd", "max"):
+        assert supports_period(period)
+        period_start(period)
+    assert not supports_period("60d")
+    with pytest.raises(ValueError):
+        period_start("60d")
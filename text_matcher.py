@@ -0,0 +1,206 @@
+"""Multi-pattern keyword/symbol matching in one pass per text (Aho-Corasick)."""
+import functools
+import threading
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+# Boundary modes:
+#   "word"  - the match must not touch a letter/digit on either side ("it" won't match "profit")
+#   "start" - only the left side must be a boundary, so "gain" matches "gains"
+#   "none"  - plain substring match
+BOUNDARY_MODES = ("word", "start", "none")
+
+# Company names and common short forms that headlines use instead of the ticker
+SYMBOL_ALIASES: Dict[str, List[str]] = {
+    "RELIANCE.NS": ["reliance industries", "ril"],
+    "TCS.NS": ["tata consultancy"],
+    "INFY.NS": ["infosys"],
+    "HDFCBANK.NS": ["hdfc bank"],
+    "ICICIBANK.NS": ["icici bank"],
+    "KOTAKBANK.NS": ["kotak mahindra bank", "kotak bank"],
+    "HINDUNILVR.NS": ["hindustan unilever", "hul"],
+    "MARUTI.NS": ["maruti suzuki"],
+    "BAJFINANCE.NS": ["bajaj finance"],
+    "ADANIENT.NS": ["adani enterprises"],
+    "TECHM.NS": ["tech mahindra"],
+    "COALINDIA.NS": ["coal india"],
+    "BPCL.NS": ["bharat petroleum"],
+    "AXISBANK.NS": ["axis bank"],
+    "SBIN.NS": ["state bank of india", "sbi"],
+    "SUNPHARMA.NS": ["sun pharma", "sun pharmaceutical"],
+    "ULTRACEMCO.NS": ["ultratech cement", "ultratech"],
+    "DRREDDY.NS": ["dr reddy's", "dr. reddy's", "dr reddys"],
+    "TATAMOTORS.NS": ["tata motors"],
+    "M&M.NS": ["mahindra & mahindra", "mahindra and mahindra"],
+    "HEROMOTOCO.NS": ["hero motocorp"],
+    "LT.NS": ["larsen & toubro", "larsen and toubro", "l&t"],
+    "ONGC.NS": ["oil and natural gas"],
+    "IOC.NS": ["indian oil"],
+    "DMART.NS": ["avenue supermarts", "d-mart"],
+    "RPOWER.NS": ["reliance power"],
+    "JPPOWER.NS": ["jaiprakash power"],
+    "IDEA.NS": ["vodafone idea"],
+    "YESBANK.NS": ["yes bank"],
+    "DISHTV.NS": ["dish tv"],
+    "GMRINFRA.NS": ["gmr infra"],
+    "SUZLON.NS": ["suzlon energy"],
+    "PCJEWELLER.NS": ["pc jeweller"],
+    "TRIDENT.NS": ["trident ltd"],
+    "BOMDYEING.NS": ["bombay dyeing"],
+    "CENTURYTEX.NS": ["century textiles"],
+    "MUTHOOTFIN.NS": ["muthoot finance"],
+    "FORTIS.NS": ["fortis healthcare"],
+}
+
+class Match(NamedTuple):
+    start: int  # offsets into text.lower()
+    end: int
+    pattern: str
+    label: str
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+class MultiPatternMatcher:
+    """Finds every occurrence of many patterns in a single scan of the text.
+
+    Patterns are case-insensitive and map to a label, so aliases (a company
+    name and its ticker) report the same label. The automaton is (re)built
+    lazily after patterns are added, once, under a lock, so a matcher shared
+    between threads is safe to search.
+    """
+
+    def __init__(self, boundary: str = "word"):
+        if boundary not in BOUNDARY_MODES:
+            raise ValueError(f"boundary must be one of {BOUNDARY_MODES}")
+        self.boundary = boundary
+        self._patterns: List[Tuple[str, str, str]] = []  # (pattern, label, boundary)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._own: List[List[int]] = [[]]  # patterns ending exactly at each state
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]  # own patterns plus those reached via fail links
+        self._built = True
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def add(self, pattern: str, label: Optional[str] = None, boundary: Optional[str] = None) -> None:
+        """Add a pattern reporting `label` (default: the pattern itself)."""
+        boundary = boundary or self.boundary
+        if boundary not in BOUNDARY_MODES:
+            raise ValueError(f"boundary must be one of {BOUNDARY_MODES}")
+        pattern = pattern.lower().strip()
+        if not pattern:
+            return
+        with self._lock:
+            index = len(self._patterns)
+            self._patterns.append((pattern, label if label is not None else pattern, boundary))
+
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._own.append([])
+                state = nxt
+            self._own[state].append(index)
+            self._built = False
+
+    def add_many(self, patterns: Dict[str, Iterable[str]], boundary: Optional[str] = None) -> None:
+        """Add {label: [patterns...]}."""
+        for label, label_patterns in patterns.items():
+            for pattern in label_patterns:
+                self.add(pattern, label, boundary)
+
+    def _build(self) -> None:
+        """Compute failure links breadth-first, if patterns were added since the last build."""
+        if self._built:
+            return
+        with self._lock:
+            if not self._built:
+                self._fail, self._out = self._failure_links()
+                self._built = True
+
+    def _failure_links(self) -> Tuple[List[int], List[List[int]]]:
+        # Built into new lists, so searches never see half-computed links
+        n = len(self._goto)
+        fail = [0] * n
+        out = [list(own) for own in self._own]
+        queue = deque()
+        for child in self._goto[0].values():
+            queue.append(child)
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                link = fail[state]
+                while link and ch not in self._goto[link]:
+                    link = fail[link]
+                fail[child] = self._goto[link].get(ch, 0)
+                out[child].extend(out[fail[child]])
+                queue.append(child)
+        return fail, out
+
+    @staticmethod
+    def _boundary_ok(text: str, start: int, end: int, boundary: str) -> bool:
+        if boundary == "none":
+            return True
+        if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]):
+            return False
+        if boundary == "word" and end < len(text) and _is_word_char(text[end]) and _is_word_char(text[end - 1]):
+            return False
+        return True
+
+    def finditer(self, text: str) -> Iterator[Match]:
+        """Yield every (possibly overlapping) match in text."""
+        self._build()
+        text = text.lower()
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                pattern, label, boundary = patterns[index]
+                start = i + 1 - len(pattern)
+                if self._boundary_ok(text, start, i + 1, boundary):
+                    yield Match(start, i + 1, pattern, label)
+
+    def labels(self, text: str) -> Set[str]:
+        """Distinct labels found in text."""
+        return {m.label for m in self.finditer(text)}
+
+    def patterns_by_label(self, text: str) -> Dict[str, Set[str]]:
+        """{label: distinct patterns found} for text."""
+        found: Dict[str, Set[str]] = {}
+        for m in self.finditer(text):
+            found.setdefault(m.label, set()).add(m.pattern)
+        return found
+
+    def count_by_label(self, text: str) -> Dict[str, int]:
+        """Number of distinct patterns found per label (how keyword lists were counted)."""
+        return {label: len(found) for label, found in self.patterns_by_label(text).items()}
+
+def build_symbol_matcher(symbols: Iterable[str],
+                         aliases: Optional[Dict[str, List[str]]] = None) -> MultiPatternMatcher:
+    """Matcher labelling each symbol by its bare ticker ("TCS" for TCS.NS) and known aliases."""
+    aliases = SYMBOL_ALIASES if aliases is None else aliases
+    matcher = MultiPatternMatcher(boundary="word")
+    for symbol in symbols:
+        matcher.add(symbol.split(".")[0], symbol)
+        for alias in aliases.get(symbol, []):
+            matcher.add(alias, symbol)
+    return matcher
+
+@functools.lru_cache(maxsize=16)
+def _cached_symbol_matcher(symbols: Tuple[str, ...]) -> MultiPatternMatcher:
+    matcher = build_symbol_matcher(symbols)
+    matcher._build()
+    return matcher
+
+def get_symbol_matcher(symbols: Iterable[str]) -> MultiPatternMatcher:
+    """Shared, prebuilt symbol matcher for a symbol list."""
+    return _cached_symbol_matcher(tuple(symbols))
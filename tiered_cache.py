@@ -0,0 +1,193 @@
+"""Tiered cache: in-process memory, then local disk, then an optional shared tier.
+
+Every cached value in the app lives under one key space of the form
+"<namespace>:<key>". The namespace selects the TTL policy and is the unit
+of invalidation across all tiers.
+"""
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+from cache_backends import SQLiteCacheBackend, create_backend, default_backend
+from cache_serializers import default_mode
+from market_calendar import market_hours_ttl
+from memory_cache import MemoryCache
+from utils import get_logger
+
+logger = get_logger("tiered_cache")
+
+class CachePolicy(NamedTuple):
+    """How long a namespace's entries live, and whether they leave the process.
+
+    ttl is either seconds or a callable returning seconds, evaluated when an
+    entry is written (see market_calendar.market_hours_ttl).
+    """
+    ttl: Union[float, Callable[[], float]]
+    persist: bool = True  # False keeps entries in the memory tier only
+
+DEFAULT_POLICY = CachePolicy(ttl=30)
+
+NAMESPACE_POLICIES: Dict[str, CachePolicy] = {
+    # cached_call namespaces (realtime_data); outside market hours these
+    # stay valid until the next session opens
+    'live_price': CachePolicy(ttl=market_hours_ttl(30)),
+    'options_chain': CachePolicy(ttl=market_hours_ttl(60)),  # Options data changes less frequently
+    'intraday_trend': CachePolicy(ttl=market_hours_ttl(45)),
+    'daily_reference': CachePolicy(ttl=6 * 3600),  # previous close/avg volume only change once a day
+    # RealTimeDataFetcher's raw bars and derived values; not worth writing to disk
+    'realtime': CachePolicy(ttl=market_hours_ttl(30), persist=False),
+    # cached_fetch results: readers pass their own max age, this only bounds retention
+    'fast': CachePolicy(ttl=48 * 3600),
+    # Open circuit breakers; each entry is written with the breaker's own backoff
+    'negative': CachePolicy(ttl=300),
+}
+
+def make_key(namespace: str, key: str) -> str:
+    return f"{namespace}:{key}"
+
+def split_key(key: str) -> Tuple[str, str]:
+    """Return (namespace, key) for a tiered cache key."""
+    namespace, sep, rest = key.partition(":")
+    return (namespace, rest) if sep else ("default", key)
+
+def shared_tier_from_env() -> Optional[SQLiteCacheBackend]:
+    """Optional shared tier: a SQLite database at CACHE_SHARED_PATH (e.g. on a shared volume)."""
+    path = os.environ.get("CACHE_SHARED_PATH")
+    if not path:
+        return None
+    try:
+        # Others can write to a shared volume: never unpickle from it
+        return SQLiteCacheBackend(path, trusted=False)
+    except Exception as e:
+        logger.error(f"Shared cache tier unavailable at {path}: {e}")
+        return None
+
+class TieredCache:
+    """Read-through memory -> local -> shared cache with per-namespace TTLs.
+
+    Reads try each tier in order and promote hits into the faster tiers for
+    the rest of the entry's lifetime. Writes go to every tier the
+    namespace's policy allows.
+    """
+
+    def __init__(self, cache_dir: str = "cache", backend: Optional[str] = None,
+                 serializer: Optional[str] = None, shared=None,
+                 max_memory_entries: int = 2048, max_memory_bytes: int = 64 * 1024 * 1024,
+                 policies: Optional[Dict[str, CachePolicy]] = None):
+        self.cache_dir = cache_dir
+        self.serializer = serializer or default_mode()  # "binary", or "json" for debugging
+        self.policies = dict(NAMESPACE_POLICIES if policies is None else policies)
+        self.memory = MemoryCache(
+            max_entries=max_memory_entries,
+            max_bytes=max_memory_bytes,
+            default_ttl=DEFAULT_POLICY.ttl
+        )
+        # One file per key, or a single SQLite database (CACHE_BACKEND=sqlite)
+        self.local = create_backend(backend or default_backend(), cache_dir, self.serializer)
+        self.shared = shared
+
+    def policy(self, namespace: str) -> CachePolicy:
+        return self.policies.get(namespace, DEFAULT_POLICY)
+
+    def ttl_for(self, namespace: str) -> float:
+        """TTL in seconds for an entry written to namespace now."""
+        ttl = self.policy(namespace).ttl
+        return ttl() if callable(ttl) else ttl
+
+    def _disk_tiers(self):
+        return [tier for tier in (self.local, self.shared) if tier is not None]
+
+    def get_entry(self, key: str, max_age: Optional[float] = None) -> Optional[Tuple[Any, datetime]]:
+        """Return (data, cached_at) for a live entry no older than max_age seconds, or None."""
+        entry = self.memory.get_entry(key)
+        if entry is None:
+            entry = self._get_from_disk(key)
+        if entry is None:
+            return None
+        if max_age is not None and (datetime.now() - entry[1]).total_seconds() > max_age:
+            return None
+        return entry
+
+    def _get_from_disk(self, key: str) -> Optional[Tuple[Any, datetime]]:
+        namespace, _ = split_key(key)
+        if not self.policy(namespace).persist:
+            return None
+        missed = []
+        for tier in self._disk_tiers():
+            try:
+                entry = tier.get(key)
+            except Exception as e:
+                logger.error(f"Cache tier read failed for {key}: {e}")
+                entry = None
+            if entry is None:
+                missed.append(tier)
+                continue
+
+            # Promote into the faster tiers for the rest of the entry's lifetime
+            remaining = None
+            if entry['expires_at'] is not None:
+                remaining = entry['expires_at'] - time.time()
+                if remaining <= 0:
+                    return None
+            for upper in missed:
+                upper.set(key, entry['data'], ttl=entry['ttl'],
+                          namespace=namespace, timestamp=entry['timestamp'])
+            memory_ttl = remaining if remaining is not None else self.ttl_for(namespace)
+            self.memory.set(key, entry['data'], memory_ttl, timestamp=entry['timestamp'])
+            return entry['data'], entry['timestamp']
+        return None
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        entry = self.get_entry(key, max_age)
+        if entry is None:
+            logger.debug(f"Cache miss: {key}")
+            return None
+        logger.debug(f"Cache hit: {key}")
+        return entry[0]
+
+    def set(self, key: str, data: Any, ttl: Optional[float] = None) -> None:
+        """Store data in every tier allowed by the key's namespace policy."""
+        namespace, _ = split_key(key)
+        policy = self.policy(namespace)
+        ttl = self.ttl_for(namespace) if ttl is None else ttl
+        timestamp = datetime.now()
+
+        self.memory.set(key, data, ttl, timestamp=timestamp)
+        if policy.persist:
+            for tier in self._disk_tiers():
+                try:
+                    tier.set(key, data, ttl=ttl, namespace=namespace, timestamp=timestamp)
+                except Exception as e:
+                    logger.error(f"Cache tier write failed for {key}: {e}")
+        logger.debug(f"Cached data: {key}")
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        for tier in self._disk_tiers():
+            tier.delete(key)
+
+    def invalidate(self, namespace: Optional[str] = None, pattern: Optional[str] = None) -> int:
+        """Remove entries from every tier: all of them, or one namespace and/or key pattern."""
+        prefix = make_key(namespace, "") if namespace else None
+        removed = self.memory.clear(pattern=pattern, prefix=prefix)
+        for tier in self._disk_tiers():
+            try:
+                removed += tier.clear(pattern=pattern, namespace=namespace)
+            except Exception as e:
+                logger.error(f"Error clearing cache tier: {e}")
+        logger.info(f"Invalidated cache: {namespace or 'all'}{f' ({pattern})' if pattern else ''}")
+        return removed
+
+    def purge_expired(self) -> int:
+        """Remove expired entries from every tier. Returns the number removed."""
+        removed = self.memory.purge_expired()
+        for tier in self._disk_tiers():
+            try:
+                removed += tier.purge_expired()
+            except Exception as e:
+                logger.error(f"Error purging cache tier: {e}")
+        return removed
+
+# Global instance shared by cache_manager, fast_cache and realtime_data
+tiered_cache = TieredCache(shared=shared_tier_from_env())
@@ -7,7 +7,8 @@ from realtime_data import get_index_data, get_stock_data, data_fetcher
 from intraday_predictor import get_index_predictions, get_stock_picks
 from enhanced_intraday_predictor import get_enhanced_intraday_tables
 from stable_predictor import get_stable_predictions
-from fast_cache import cached_fetch, CACHE_KEYS
+from fast_cache import cached_fetch, cached_fetch_with_status, CACHE_KEYS
+from prefetch_scheduler import start_background_prefetch
 from utils import get_logger
 import pandas as pd
 import numpy as np
@@ -18,6 +19,15 @@ from typing import Dict
 
 logger = get_logger("ui_app")
 
+# Background cache warming; started once per process, however often the script reruns
+start_background_prefetch()
+
+def _show_freshness(result) -> None:
+    """Tell the user when a stale cached value is shown during a background refresh."""
+    if not result.fresh and result.data is not None:
+        minutes = int(result.age_seconds // 60)
+        st.caption(f"⏳ Showing data from {minutes} min ago - refreshing in the background")
+
 def _display_index_card(index_name: str, pred_data: Dict, full_width: bool = False):
     """Display a single index card with responsive design."""
     # Determine card color based on signal
@@ -240,8 +250,8 @@ st.sidebar.info("""
 st.sidebar.markdown("---")
 st.sidebar.markdown("**🗂️ Cache Management:**")
 if st.sidebar.button("🔄 Clear Cache & Regenerate"):
-    from fast_cache import fast_cache
-    fast_cache.clear()
+    from tiered_cache import tiered_cache
+    tiered_cache.invalidate()
     from stable_predictor import stable_predictor
     try:
         os.remove(stable_predictor.prediction_file)
@@ -254,9 +264,9 @@ if st.sidebar.button("🔄 Clear Cache & Regenerate"):
 st.sidebar.markdown("---")
 st.sidebar.markdown("**📰 Dynamic Reasons:**")
 if st.sidebar.button("🌐 Refresh with Latest News", help="Generate new predictions with current market news"):
-    from fast_cache import fast_cache
+    from tiered_cache import tiered_cache
     from stable_predictor import stable_predictor
-    fast_cache.clear()
+    tiered_cache.invalidate()
     try:
         os.remove(stable_predictor.prediction_file)
     except:
@@ -291,12 +301,15 @@ if page == "🎯 Live Market Calls":
     # Fetch real-time predictions with fast caching
     with st.spinner("🔄 Loading market data..."):
         try:
-            # Use cached data for faster loading
-            predictions = cached_fetch(
+            # Use cached data for faster loading; serve stale data while it refreshes
+            predictions_result = cached_fetch_with_status(
                 CACHE_KEYS['index_predictions'],
                 get_index_predictions,
-                max_age_hours=0.5  # 30 minutes cache
+                max_age_hours=0.5,  # 30 minutes cache
+                stale_window_hours=1
             )
+            predictions = predictions_result.data
+            _show_freshness(predictions_result)
             
             # Display index predictions in responsive cards
             # Responsive columns based on screen size
@@ -422,11 +435,14 @@ elif page == "📊 Intraday Stock Picks":
     with st.spinner(" Loading optimized predictions..."):
         try:
             # Use stable predictor with caching for ultra-fast loading
-            intraday_tables = cached_fetch(
+            tables_result = cached_fetch_with_status(
                 CACHE_KEYS['stock_predictions'],
                 get_stable_predictions,
-                max_age_hours=23  # 23 hours cache (stable for the day)
+                max_age_hours=23,  # 23 hours cache (stable for the day)
+                stale_window_hours=2
             )
+            intraday_tables = tables_result.data
+            _show_freshness(tables_result)
             
             # Display each table
             for table_name, stocks in intraday_tables.items():
@@ -605,7 +621,8 @@ elif page == "📰 News Sentiment":
     
     st.write("---")
     
-    news = fetch_market_news()
+    # Kept warm by the prefetch scheduler's market_news job
+    news = cached_fetch(CACHE_KEYS['market_news'], fetch_market_news, max_age_hours=0.25)
     
     if news:
         st.subheader("📺 News Sentiment by Source")